@@ -4,7 +4,6 @@ FastAPI сервер для предоставления новостей фро
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Optional
-import yaml
 import logging
 import asyncio
 from pathlib import Path
@@ -12,8 +11,8 @@ import json
 from datetime import datetime
 from pydantic import BaseModel
 
-from rss_parser import RSSParser
-from summarizer import NewsSummarizer
+from pipeline import NewsPipeline
+from scheduler import FeedScheduler
 
 # Настройка логирования
 logging.basicConfig(
@@ -47,9 +46,26 @@ news_cache = {
     "is_updating": False
 }
 
+# Планировщик опроса источников
+scheduler_state = {
+    "scheduler": None
+}
+
+# Очередность публикаций: полное обновление и опросы публикуют новости под общей блокировкой.
+# polled_sources - источники, новости которых опросы добавили после последнего полного обновления
+# (их ленты уже в кэше лент, но топ-новости с ними еще не пересчитаны)
+refresh_state = {
+    "lock": None,
+    "polled_sources": set()
+}
+
+# Конвейер обработки: конфигурация, клиенты лент и LLM, хранилище и кэши (создается при запуске)
+pipeline: Optional[NewsPipeline] = None
+
 
 # Pydantic модели для API
 class NewsItem(BaseModel):
+    id: Optional[str] = None
     title: str
     link: str
     description: str
@@ -58,6 +74,10 @@ class NewsItem(BaseModel):
     source_url: str
     category: str
     summary: Optional[str] = None
+    summary_pending: Optional[bool] = None
+    summary_source: Optional[str] = None
+    lang: Optional[str] = None
+    alternate_sources: Optional[List[Dict[str, str]]] = None
 
 
 class NewsResponse(BaseModel):
@@ -80,12 +100,6 @@ class StatsResponse(BaseModel):
     categories: Dict[str, int]
 
 
-def load_config():
-    config_path = Path('config.yaml')
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
-
-
 def load_cached_news():
     output_dir = Path('output')
     
@@ -119,69 +133,242 @@ def load_cached_news():
         return None
 
 
+def get_pipeline() -> NewsPipeline:
+    """Общий конвейер обработки (создается при первом обращении, если сервер запущен без startup)"""
+    global pipeline
+    if pipeline is None:
+        pipeline = NewsPipeline.from_file('config.yaml')
+    return pipeline
+
+
+def running_pipeline() -> NewsPipeline:
+    """
+    Конвейер обработки для эндпоинтов состояния (не создается заново)
+
+    Raises:
+        HTTPException: 503, если сервер еще не запущен или уже остановлен
+    """
+    if pipeline is None:
+        raise HTTPException(status_code=503, detail="Конвейер обработки новостей не запущен")
+    return pipeline
+
+
+def get_refresh_lock() -> asyncio.Lock:
+    """Блокировка публикаций (создается в цикле событий сервера)"""
+    if refresh_state['lock'] is None:
+        refresh_state['lock'] = asyncio.Lock()
+    return refresh_state['lock']
+
+
+def copy_news_item(news_item: Dict) -> Dict:
+    """Копия новости, которую можно менять, не затрагивая опубликованную версию"""
+    news_copy = dict(news_item)
+    if 'alternate_sources' in news_copy:
+        news_copy['alternate_sources'] = list(news_copy['alternate_sources'])
+    return news_copy
+
+
+def categorize_news(config: Dict, news_list: List[Dict]) -> Dict[str, List[Dict]]:
+    """Группировка новостей по категориям из config.yaml"""
+    categorized = {}
+    for category in config['rss_sources'].keys():
+        categorized[category] = [
+            n for n in news_list if n.get('category') == category
+        ]
+    return categorized
+
+
+def publish_partial(config: Dict, news_list: List[Dict]):
+    """
+    Промежуточная публикация новостей в кэш API во время обновления
+    
+    Новости без готового резюме помечены summary_pending. Топ-новости
+    и файлы в output/ обновляются только по завершении обновления.
+    
+    Args:
+        config: Конфигурация
+        news_list: Текущий список новостей
+    """
+    news_cache['all_news'] = news_list
+    news_cache['news_by_category'] = categorize_news(config, news_list)
+
+
+def publish_news(config: Dict, summarized_news: List[Dict], top_news: List[Dict]):
+    """
+    Публикация новостей в кэш API и сохранение в output/
+    
+    Args:
+        config: Конфигурация
+        summarized_news: Все новости
+        top_news: Топ-новости дня
+    """
+    news_cache['all_news'] = summarized_news
+    news_cache['top_news'] = top_news
+    
+    categorized = categorize_news(config, summarized_news)
+    news_cache['news_by_category'] = categorized
+    news_cache['last_update'] = datetime.now().isoformat()
+    
+    output_dir = Path('output')
+    output_dir.mkdir(exist_ok=True)
+    
+    with open(output_dir / 'all_news.json', 'w', encoding='utf-8') as f:
+        json.dump(summarized_news, f, ensure_ascii=False, indent=2)
+    
+    with open(output_dir / 'top_news.json', 'w', encoding='utf-8') as f:
+        json.dump(top_news, f, ensure_ascii=False, indent=2)
+    
+    with open(output_dir / 'news_by_category.json', 'w', encoding='utf-8') as f:
+        json.dump(categorized, f, ensure_ascii=False, indent=2)
+
+
 async def update_news_background():
+    news_cache['is_updating'] = True
     try:
-        news_cache['is_updating'] = True
-        logger.info("Начало обновления новостей...")
-        
-        # Загрузка конфигурации
-        config = load_config()
-        
-        # Создание парсера и суммаризатора
-        parser = RSSParser(max_news_per_source=config['news']['max_news_per_source'])
-        summarizer = NewsSummarizer(config['api'])
-        
-        # Парсинг RSS
-        news_by_category = parser.parse_all_sources(config['rss_sources'])
-        all_news = parser.get_all_news_flat(news_by_category)
-        
-        # Суммаризация
-        summarized_news = await summarizer.summarize_all_news(all_news)
-        
-        # Выбор топ-новостей
-        top_news = await summarizer.select_top_news(
-            summarized_news,
-            top_count=config['news']['top_news_count']
-        )
-        
-        news_cache['all_news'] = summarized_news
-        news_cache['top_news'] = top_news
-        
-        categorized = {}
-        for category in config['rss_sources'].keys():
-            categorized[category] = [
-                n for n in summarized_news if n.get('category') == category
-            ]
-        news_cache['news_by_category'] = categorized
-        news_cache['last_update'] = datetime.now().isoformat()
-        
-        output_dir = Path('output')
-        output_dir.mkdir(exist_ok=True)
-        
-        with open(output_dir / 'all_news.json', 'w', encoding='utf-8') as f:
-            json.dump(summarized_news, f, ensure_ascii=False, indent=2)
-        
-        with open(output_dir / 'top_news.json', 'w', encoding='utf-8') as f:
-            json.dump(top_news, f, ensure_ascii=False, indent=2)
-        
-        with open(output_dir / 'news_by_category.json', 'w', encoding='utf-8') as f:
-            json.dump(categorized, f, ensure_ascii=False, indent=2)
-        
-        logger.info("Новости успешно обновлены")
-        
+        async with get_refresh_lock():
+            await refresh_news()
     except Exception as e:
         logger.error(f"Ошибка обновления новостей: {e}")
     finally:
         news_cache['is_updating'] = False
 
 
+async def refresh_news():
+    """Полное обновление: сбор всех лент, суммаризация новых новостей и пересчет топ-новостей"""
+    logger.info("Начало обновления новостей...")
+    
+    # Долгоживущий конвейер: конфигурация, клиенты и кэши переиспользуются между обновлениями
+    news_pipeline = get_pipeline()
+    config = news_pipeline.config
+    
+    # Источники, опрошенные до начала сбора: их новости попадут в это обновление
+    polled_sources = set(refresh_state['polled_sources'])
+    
+    # Асинхронный парсинг RSS и схлопывание одинаковых новостей из разных источников
+    _, all_news = await news_pipeline.collect()
+    
+    # Если ни одна лента не изменилась ни здесь, ни в плановых опросах, повторная обработка не нужна
+    if not news_pipeline.parser.has_changes() and not polled_sources and news_cache['all_news']:
+        logger.info("Ленты не изменились с прошлого обновления, пропускаем суммаризацию")
+        # Время обновления сдвигается, только если ленты действительно ответили
+        if news_pipeline.parser.has_responses():
+            news_cache['last_update'] = datetime.now().isoformat()
+        else:
+            logger.warning("Ни одна лента не ответила, время последнего обновления не меняется")
+        return
+    
+    # Суммаризация только новых новостей (готовые батчи сразу видны клиентам) и выбор топ-новостей
+    summarized_news, top_news = await news_pipeline.process(
+        all_news, 'refresh',
+        on_progress=lambda news_list: publish_partial(config, news_list)
+    )
+    
+    publish_news(config, summarized_news, top_news)
+    news_pipeline.parser.save_feed_cache()
+    refresh_state['polled_sources'] -= polled_sources
+    
+    logger.info("Новости успешно обновлены")
+
+
+async def poll_source_background(category: str, source: Dict[str, str]) -> List[Dict]:
+    """
+    Плановый опрос одного источника
+    
+    Новые новости источника суммаризируются и заменяют его новости в кэше,
+    топ-новости пересчитываются при следующем полном обновлении (источник
+    запоминается в refresh_state['polled_sources']).
+    
+    Args:
+        category: Категория источника
+        source: Источник из config.yaml
+        
+    Returns:
+        Новости ленты (для оценки частоты публикаций)
+    """
+    news_pipeline = get_pipeline()
+    parser = news_pipeline.parser
+    url = source['url']
+    
+    # Свое состояние ленты: parser.feed_status принадлежит полному обновлению
+    feed_status: Dict[str, str] = {}
+    news = await parser.fetch_feed(
+        url, source.get('name', 'Неизвестный источник'), source.get('deadline'), feed_status
+    )
+    for item in news:
+        item['category'] = category
+    
+    if feed_status.get(url) != 'updated':
+        return news
+    
+    # Следующее полное обновление пересчитает топ-новости, даже если ленты не изменятся
+    refresh_state['polled_sources'].add(url)
+    if news_cache['is_updating']:
+        return news
+    
+    async with get_refresh_lock():
+        # Новости, уже опубликованные другими источниками, добавляются к ним как альтернативные.
+        # Дедупликация меняет словари, поэтому работает с копиями: клиенты читают news_cache
+        # без изменений до публикации
+        others = [copy_news_item(n) for n in news_cache['all_news'] if n.get('source_url') != url]
+        deduped = news_pipeline.deduplicate(others + [dict(n) for n in news])
+        source_news = [n for n in deduped if n.get('source_url') == url]
+        
+        with news_pipeline.llm_scope('poll'):
+            summarized = await news_pipeline.summarize_new(source_news)
+        
+        # Заменяем новости источника на их новую версию, сохраняя позицию в списке
+        all_news = []
+        inserted = False
+        other_news = iter(others)
+        for item in news_cache['all_news']:
+            if item.get('source_url') == url:
+                if not inserted:
+                    all_news.extend(summarized)
+                    inserted = True
+                continue
+            all_news.append(next(other_news))
+        if not inserted:
+            all_news.extend(summarized)
+        
+        publish_news(news_pipeline.config, all_news, news_cache['top_news'])
+        parser.save_feed_cache(feed_status)
+    return news
+
+
 # API Endpoints
 
 @app.on_event("startup")
 async def startup_event():
-    """Загрузка кэша при старте сервера"""
+    """Загрузка кэша и создание конвейера обработки при старте сервера"""
     logger.info("Запуск API сервера...")
     load_cached_news()
+    get_refresh_lock()
+    
+    config = get_pipeline().config
+    scheduler_config = config.get('scheduler', {})
+    if scheduler_config.get('enabled', False):
+        scheduler = FeedScheduler(
+            config['rss_sources'],
+            poll_source_background,
+            min_interval=scheduler_config.get('min_interval', 300),
+            max_interval=scheduler_config.get('max_interval', 21600),
+            default_interval=scheduler_config.get('default_interval', 1800),
+            jitter=scheduler_config.get('jitter', 0.2)
+        )
+        scheduler.start()
+        scheduler_state['scheduler'] = scheduler
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Остановка планировщика и конвейера обработки"""
+    global pipeline
+    if scheduler_state['scheduler']:
+        await scheduler_state['scheduler'].stop()
+        scheduler_state['scheduler'] = None
+    if pipeline is not None:
+        await pipeline.close()
+        pipeline = None
 
 
 @app.get("/", tags=["Root"])
@@ -197,6 +384,9 @@ async def root():
             "/categories": "Список категорий",
             "/stats": "Статистика",
             "/update": "Обновить новости",
+            "/scheduler": "Состояние планового опроса источников",
+            "/sources/health": "Состояние источников",
+            "/metrics/llm": "Токены, задержки и стоимость запросов к LLM",
             "/docs": "Документация API"
         }
     }
@@ -292,7 +482,7 @@ async def get_stats():
     if not news_cache['all_news']:
         load_cached_news()
     
-    config = load_config()
+    config = get_pipeline().config
     
     # Подсчет источников
     sources_count = sum(
@@ -333,6 +523,41 @@ async def update_news(background_tasks: BackgroundTasks):
     }
 
 
+@app.get("/sources/health", tags=["Sources"])
+async def get_sources_health():
+    """Состояние источников: задержки, ошибки и состояние circuit breaker"""
+    sources = running_pipeline().source_health.snapshot()
+    return {
+        "sources": sources,
+        "open_count": sum(1 for s in sources if s['state'] == 'open')
+    }
+
+
+@app.get("/metrics/llm", tags=["Statistics"])
+async def get_llm_metrics_snapshot(limit: Optional[int] = None, kind: Optional[str] = None):
+    """Токены, задержки, повторы и стоимость запросов к LLM по этапам: за все время и по последним прогонам"""
+    return running_pipeline().metrics.snapshot(limit=limit, kind=kind)
+
+
+@app.get("/metrics/llm/{run_id}", tags=["Statistics"])
+async def get_llm_run_metrics(run_id: str):
+    """Показатели запросов к LLM одного прогона обработки"""
+    run = running_pipeline().metrics.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Прогон {run_id} не найден")
+    return run
+
+
+@app.get("/scheduler", tags=["Update"])
+async def get_scheduler_status():
+    """Состояние планового опроса источников"""
+    scheduler = scheduler_state['scheduler']
+    return {
+        "enabled": scheduler is not None,
+        "sources": scheduler.status() if scheduler else []
+    }
+
+
 @app.get("/health", tags=["Health"])
 async def health_check():
     cached_news_count = 0
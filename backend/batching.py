@@ -0,0 +1,110 @@
+"""
+Формирование батчей для суммаризации по оценке токенов с адаптацией размера
+"""
+import logging
+from typing import Dict, Any, List, Deque, Optional
+
+from compaction import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Служебная часть batch промпта (инструкции и формат ответа)
+PROMPT_OVERHEAD_TOKENS = 350
+# Оформление одной новости в промпте ("НОВОСТЬ N:", "Заголовок:", "Содержание:")
+ITEM_OVERHEAD_TOKENS = 12
+
+
+class AdaptiveBatcher:
+    """Упаковывает новости в батчи до бюджета токенов и подстраивает бюджет по задержкам и обрезкам ответов"""
+
+    def __init__(self, target_tokens: int = 3000, min_tokens: int = 800, max_tokens: int = 12000,
+                 max_completion_tokens: int = 4000, completion_tokens_per_item: int = 150,
+                 max_items: int = 20, target_latency: float = 30.0):
+        """
+        Инициализация
+
+        Args:
+            target_tokens: Начальный бюджет токенов на запрос (промпт + ответ)
+            min_tokens: Нижняя граница бюджета
+            max_tokens: Верхняя граница бюджета
+            max_completion_tokens: Максимальная оценка ответа на один запрос
+            completion_tokens_per_item: Оценка ответа на одну новость (заголовок + резюме)
+            max_items: Максимальное количество новостей в батче
+            target_latency: Желаемая длительность одного запроса в секундах
+        """
+        self.target_tokens = float(target_tokens)
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.max_completion_tokens = max_completion_tokens
+        self.completion_tokens_per_item = completion_tokens_per_item
+        self.max_items = max_items
+        self.target_latency = target_latency
+
+    def item_tokens(self, news_item: Dict[str, Any]) -> int:
+        """Оценка токенов промпта для одной новости"""
+        return (
+            estimate_tokens(news_item.get('title', ''))
+            + estimate_tokens(news_item.get('description', ''))
+            + ITEM_OVERHEAD_TOKENS
+        )
+
+    def take_batch(self, pending: Deque[int], news_list: List[Dict[str, Any]],
+                   fixed_size: Optional[int] = None) -> List[int]:
+        """
+        Извлечение следующего батча из очереди
+
+        Новости добавляются, пока оценка промпта и ответа укладывается в текущий
+        бюджет. Первая новость берется всегда, даже если превышает бюджет.
+
+        Args:
+            pending: Очередь индексов новостей (изменяется)
+            news_list: Список новостей
+            fixed_size: Фиксированный размер батча вместо бюджета токенов
+
+        Returns:
+            Индексы новостей батча
+        """
+        batch: List[int] = []
+        if fixed_size:
+            while pending and len(batch) < fixed_size:
+                batch.append(pending.popleft())
+            return batch
+
+        total = PROMPT_OVERHEAD_TOKENS
+        completion = 0
+        while pending and len(batch) < self.max_items:
+            tokens = self.item_tokens(news_list[pending[0]]) + self.completion_tokens_per_item
+            next_completion = completion + self.completion_tokens_per_item
+            if batch and (total + tokens > self.target_tokens or next_completion > self.max_completion_tokens):
+                break
+            batch.append(pending.popleft())
+            total += tokens
+            completion = next_completion
+        return batch
+
+    def record(self, latency: float, truncated: bool, missing: int):
+        """
+        Адаптация бюджета по результату запроса
+
+        При обрезке ответа или пропущенных резюме бюджет уменьшается в 1.5 раза,
+        при превышении желаемой задержки - на 15%, иначе плавно растет на 10%.
+
+        Args:
+            latency: Длительность запроса в секундах
+            truncated: Ответ обрезан по лимиту токенов (finish_reason == 'length')
+            missing: Количество новостей батча без резюме
+        """
+        previous = self.target_tokens
+        if truncated or missing:
+            self.target_tokens /= 1.5
+        elif latency > self.target_latency:
+            self.target_tokens *= 0.85
+        else:
+            self.target_tokens *= 1.1
+        self.target_tokens = max(self.min_tokens, min(self.max_tokens, self.target_tokens))
+
+        if abs(self.target_tokens - previous) >= 1:
+            logger.info(
+                f"Бюджет батча: {previous:.0f} -> {self.target_tokens:.0f} токенов "
+                f"(задержка {latency:.1f} сек, обрезка: {truncated}, без резюме: {missing})"
+            )
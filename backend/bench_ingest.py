@@ -0,0 +1,146 @@
+"""
+Бенчмарк сбора новостей на воспроизводимых лентах без обращения к сети
+
+Примеры:
+    python bench_ingest.py --feeds 50 --items 200 --latency 0.05 --jitter 0.1
+    python bench_ingest.py --replay-dir fixtures/feeds --runs 5 --workers 4
+"""
+import argparse
+import asyncio
+import logging
+import resource
+import sys
+import time
+from typing import Dict, Any, List
+
+from feed_replay import ReplayTransport, load_recorded_feeds, synthetic_sources
+from rss_parser import RSSParser
+from source_health import SourceHealth
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль q (0..100) по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb(who: int) -> float:
+    """Пиковый RSS процесса (или его дочерних процессов) в мегабайтах"""
+    maxrss = resource.getrusage(who).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS - в байтах
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Прогон сбора новостей по всем лентам несколько раз
+
+    Args:
+        args: Аргументы командной строки
+
+    Returns:
+        Итоговые метрики
+    """
+    if args.replay_dir:
+        payloads = load_recorded_feeds(args.replay_dir)
+        sources_by_category = {'записанные': [{'url': url, 'name': url} for url in payloads]}
+    else:
+        sources_by_category, payloads = synthetic_sources(args.feeds, args.items, args.description_chars)
+
+    health = SourceHealth(failure_threshold=10 ** 9)
+    parser = RSSParser(
+        max_news_per_source=args.max_news,
+        fetch_config={
+            'max_concurrency': args.concurrency,
+            'per_host_limit': args.per_host_limit,
+            'deadline': args.deadline
+        },
+        parse_workers=args.workers,
+        streaming_parse=args.streaming,
+        source_health=health,
+        description_tokens=args.description_tokens
+    )
+    parser.fetcher.transport = ReplayTransport(payloads, latency=args.latency, jitter=args.jitter, seed=args.seed)
+
+    latencies: List[float] = []
+    durations: List[float] = []
+    items = 0
+    feeds = 0
+    errors = 0
+    try:
+        for run in range(args.warmup + args.runs):
+            start_time = time.perf_counter()
+            news_by_category = await parser.parse_all_sources_async(sources_by_category)
+            duration = time.perf_counter() - start_time
+            if run < args.warmup:
+                continue
+
+            durations.append(duration)
+            feeds += len(payloads)
+            items += sum(len(news) for news in news_by_category.values())
+            errors += sum(1 for status in parser.feed_status.values() if status == 'error')
+            latencies.extend(record['last_latency'] for record in health.records.values())
+    finally:
+        await parser.close()
+
+    total_time = sum(durations)
+    return {
+        'runs': args.runs,
+        'feeds_per_run': len(payloads),
+        'payload_mb': sum(len(payload) for payload in payloads.values()) / (1024 * 1024),
+        'run_time_avg': total_time / len(durations) if durations else 0.0,
+        'feeds_per_sec': feeds / total_time if total_time else 0.0,
+        'items_per_sec': items / total_time if total_time else 0.0,
+        'feed_latency_p50': percentile(latencies, 50),
+        'feed_latency_p99': percentile(latencies, 99),
+        'errors': errors,
+        'peak_rss_mb': peak_rss_mb(resource.RUSAGE_SELF),
+        'peak_rss_workers_mb': peak_rss_mb(resource.RUSAGE_CHILDREN)
+    }
+
+
+def main():
+    """Точка входа бенчмарка"""
+    parser = argparse.ArgumentParser(description="Бенчмарк сбора RSS лент без сети")
+    parser.add_argument('--replay-dir', help="Каталог записанных лент (иначе синтетические ленты)")
+    parser.add_argument('--feeds', type=int, default=18, help="Количество синтетических лент")
+    parser.add_argument('--items', type=int, default=100, help="Записей в синтетической ленте")
+    parser.add_argument('--description-chars', type=int, default=2000, help="Длина описания синтетической записи")
+    parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа ленты (сек)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Случайная добавка к задержке (сек)")
+    parser.add_argument('--seed', type=int, default=42, help="Зерно случайных задержек")
+    parser.add_argument('--runs', type=int, default=3, help="Количество замеряемых прогонов")
+    parser.add_argument('--warmup', type=int, default=1, help="Количество прогревочных прогонов")
+    parser.add_argument('--max-news', type=int, default=7, help="max_news_per_source")
+    parser.add_argument('--concurrency', type=int, default=10, help="Одновременных запросов")
+    parser.add_argument('--per-host-limit', type=int, default=10, help="Одновременных запросов к хосту")
+    parser.add_argument('--deadline', type=float, default=20.0, help="Дедлайн ленты (сек)")
+    parser.add_argument('--workers', type=int, default=0, help="Размер пула процессов парсинга")
+    parser.add_argument('--streaming', action='store_true', help="Потоковый парсинг")
+    parser.add_argument('--description-tokens', type=int, default=200, help="Бюджет токенов описания")
+    args = parser.parse_args()
+
+    # rss_parser при импорте настраивает корневой логгер на INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    result = asyncio.run(run_benchmark(args))
+
+    print("=" * 60)
+    print("БЕНЧМАРК СБОРА НОВОСТЕЙ")
+    print("=" * 60)
+    print(f"Лент за прогон:          {result['feeds_per_run']} ({result['payload_mb']:.1f} МБ)")
+    print(f"Прогонов:                {result['runs']}")
+    print(f"Среднее время прогона:   {result['run_time_avg']:.3f} сек")
+    print(f"Лент в секунду:          {result['feeds_per_sec']:.1f}")
+    print(f"Новостей в секунду:      {result['items_per_sec']:.1f}")
+    print(f"Задержка ленты p50:      {result['feed_latency_p50'] * 1000:.1f} мс")
+    print(f"Задержка ленты p99:      {result['feed_latency_p99'] * 1000:.1f} мс")
+    print(f"Ошибок:                  {result['errors']}")
+    print(f"Пиковый RSS:             {result['peak_rss_mb']:.1f} МБ "
+          f"(воркеры парсинга: {result['peak_rss_workers_mb']:.1f} МБ)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+Нагрузочный бенчмарк суммаризации на локальном OpenAI-совместимом сервере без расхода токенов
+
+Сервер mock_openai.py запускается в том же процессе (или используется внешний
+через --base-url), суммаризатор настраивается из config.yaml.
+
+Примеры:
+    python bench_summarizer.py --items 1000 10000 --latency 0.2 --distribution lognormal
+    python bench_summarizer.py --items 100000 --max-in-flight 32 --rate-limit-rate 0.02 --text-format
+    python bench_summarizer.py --items 5000 --base-url http://127.0.0.1:8001/v1
+"""
+import argparse
+import asyncio
+import copy
+import logging
+import os
+import random
+import resource
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+import yaml
+
+from bench_ingest import peak_rss_mb
+from llm_metrics import LLMMetrics
+from mock_openai import MockLLM, add_mock_arguments, create_app, mock_from_args
+from summarizer import NewsSummarizer
+
+WORDS = ('government announces new plan for energy market after record growth in technology sector '
+         'while scientists report results of climate study and football club signs striker').split()
+
+
+def synthetic_news(count: int, lang: str = 'en', description_chars: int = 600, sources: int = 50,
+                   categories: int = 6, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Синтетические новости в формате RSSParser
+
+    Args:
+        count: Количество новостей
+        lang: Язык заголовков (en - требуют перевода, ru - уже на русском)
+        description_chars: Примерная длина описания
+        sources: Количество источников
+        categories: Количество категорий
+        seed: Зерно генератора
+
+    Returns:
+        Список новостей
+    """
+    rng = random.Random(seed)
+    sentence = ('The company announced new research results published in the journal. '
+                if lang == 'en' else 'Компания объявила о новых результатах исследования, опубликованных в журнале. ')
+    now = datetime.now(timezone.utc)
+    news_list = []
+    for i in range(count):
+        if lang == 'en':
+            title = ' '.join(rng.choice(WORDS) for _ in range(8)).capitalize() + f' {i}'
+        else:
+            title = f"Синтетическая новость номер {i}"
+        body = (sentence * (description_chars // len(sentence) + 1))[:description_chars]
+        source = i % sources
+        news_list.append({
+            'id': f"bench-{i}",
+            'title': title,
+            'description': f"{title}. {body}",
+            'link': f"https://feeds.example/{source}/news/{i}",
+            'published': (now - timedelta(minutes=rng.randint(0, 48 * 60))).strftime('%Y-%m-%d %H:%M:%S'),
+            'source': f"Лента {source}",
+            'source_url': f"https://feeds.example/{source}/rss",
+            'category': f"категория-{source % categories}",
+            'lang': lang
+        })
+    return news_list
+
+
+def free_port() -> int:
+    """Свободный TCP порт на localhost"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def bench_api_config(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    """
+    Настройки суммаризатора из config.yaml с переопределениями бенчмарка
+
+    Кэш суммаризаций и память переводов отключены, чтобы каждый прогон
+    обращался к серверу.
+    """
+    with open(args.config, 'r', encoding='utf-8') as f:
+        api_config = copy.deepcopy(yaml.safe_load(f)['api'])
+
+    openai_config = api_config.setdefault('openai', {})
+    openai_config['base_url'] = base_url
+    openai_config['structured_output'] = not args.text_format
+    api_config.setdefault('summarizer', {})['mode'] = 'llm'
+    api_config.setdefault('top_news', {})['mode'] = 'llm'
+    api_config.setdefault('summary_cache', {})['enabled'] = False
+    api_config.setdefault('translation_memo', {})['enabled'] = False
+
+    limits_config = api_config.setdefault('rate_limits', {})
+    limits_config['refresh_deadline'] = 0
+    if args.max_in_flight is not None:
+        limits_config['max_in_flight'] = args.max_in_flight
+    if args.requests_per_minute is not None:
+        limits_config['requests_per_minute'] = args.requests_per_minute
+    if args.tokens_per_minute is not None:
+        limits_config['tokens_per_minute'] = args.tokens_per_minute
+    return api_config
+
+
+async def run_size(api_config: Dict[str, Any], args: argparse.Namespace, count: int) -> Dict[str, Any]:
+    """
+    Суммаризация и выбор топ-новостей для одного объема новостей
+
+    Args:
+        api_config: Настройки суммаризатора
+        args: Аргументы командной строки
+        count: Количество новостей
+
+    Returns:
+        Метрики прогона
+    """
+    news_list = synthetic_news(count, args.lang, args.description_chars, seed=args.seed)
+    metrics = LLMMetrics(max_samples=10 ** 6)
+    summarizer = NewsSummarizer(api_config, metrics=metrics)
+    try:
+        with metrics.run('bench') as run:
+            start_time = time.perf_counter()
+            summarized = await summarizer.summarize_all_news(news_list)
+            summarize_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            top_news = await summarizer.select_top_news(summarized, top_count=args.top_count)
+            top_time = time.perf_counter() - start_time
+    finally:
+        summarizer.close()
+        await summarizer.client.close()
+
+    snapshot = metrics.run_snapshot(run)
+    batches = snapshot['stages'].get('summary_batch', {})
+    return {
+        'items': count,
+        'summarize_time': summarize_time,
+        'items_per_sec': count / summarize_time if summarize_time else 0.0,
+        'top_time': top_time,
+        'top_count': len(top_news),
+        'local_fallbacks': sum(1 for news in summarized if news.get('summary_source') == 'local'),
+        'batch_p50': batches.get('latency_p50', 0.0),
+        'batch_p95': batches.get('latency_p95', 0.0),
+        'batch_p99': batches.get('latency_p99', 0.0),
+        'stages': snapshot['stages'],
+        'total': snapshot['total'],
+        'final_batch_tokens': summarizer.batcher.target_tokens
+    }
+
+
+def check_canned_result(mock: MockLLM, result: Dict[str, Any]):
+    """
+    Проверка, что прогон на готовых ответах mock сервера не ушел в запасной путь
+
+    Готовые ответы написаны на русском и разбираются без ошибок, поэтому
+    отдельных переводов резюме быть не должно.
+
+    Raises:
+        AssertionError: Если суммаризатор переводил резюме отдельными запросами
+    """
+    if mock.mode != 'canned':
+        return
+    translations = result['stages'].get('summary_translation', {}).get('calls', 0)
+    if translations:
+        raise AssertionError(
+            f"Ответы mock сервера не разобраны: {translations} отдельных переводов резюме "
+            f"(ожидалось 0)"
+        )
+
+
+async def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    Прогоны бенчмарка для всех объемов новостей
+
+    Args:
+        args: Аргументы командной строки
+
+    Returns:
+        Метрики прогонов
+    """
+    os.environ.setdefault('OPENAI_API_KEY', 'mock')
+    mock = None
+    server: Optional[uvicorn.Server] = None
+    server_task = None
+    base_url = args.base_url
+    if not base_url:
+        mock = mock_from_args(args)
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(
+            create_app(mock), host='127.0.0.1', port=port, log_level='warning', access_log=False
+        ))
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            if server_task.done():
+                server_task.result()
+            await asyncio.sleep(0.05)
+        base_url = f"http://127.0.0.1:{port}/v1"
+
+    api_config = bench_api_config(args, base_url)
+    results = []
+    try:
+        for count in args.items:
+            if mock:
+                mock.statuses.clear()
+            result = await run_size(api_config, args, count)
+            if mock:
+                result['server_statuses'] = dict(mock.statuses)
+                check_canned_result(mock, result)
+            results.append(result)
+    finally:
+        if server:
+            server.should_exit = True
+            await server_task
+    return results
+
+
+def print_result(result: Dict[str, Any]):
+    """Вывод метрик одного прогона"""
+    total = result['total']
+    print("=" * 60)
+    print(f"НОВОСТЕЙ: {result['items']}")
+    print("=" * 60)
+    print(f"Суммаризация:            {result['summarize_time']:.2f} сек ({result['items_per_sec']:.1f} новостей/сек)")
+    print(f"Выбор топ-новостей:      {result['top_time']:.2f} сек ({result['top_count']} выбрано)")
+    print(f"Запросов к LLM:          {total['calls']} (ошибок {total['errors']}, повторов {total['retries']}, "
+          f"дублирующих {total['hedged']})")
+    if 'server_statuses' in result:
+        statuses = ', '.join(f"{status}: {count}" for status, count in sorted(result['server_statuses'].items()))
+        print(f"Ответы сервера:          {statuses}")
+    print(f"Токены:                  {total['prompt_tokens']} + {total['completion_tokens']}")
+    print(f"Задержка батча p50/p95/p99: {result['batch_p50']:.3f} / {result['batch_p95']:.3f} / "
+          f"{result['batch_p99']:.3f} сек")
+    print(f"Локальных резюме:        {result['local_fallbacks']}")
+    print(f"Бюджет батча в конце:    {result['final_batch_tokens']:.0f} токенов")
+    for stage, stats in result['stages'].items():
+        print(f"  {stage:<20} запросов {stats['calls']:>6}, p95 {stats['latency_p95']:.3f} сек")
+    print(f"Пиковый RSS:             {peak_rss_mb(resource.RUSAGE_SELF):.1f} МБ")
+
+
+def main():
+    """Точка входа бенчмарка"""
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк суммаризации на mock OpenAI сервере")
+    parser.add_argument('--items', type=int, nargs='+', default=[1000], help="Объемы новостей (можно несколько)")
+    parser.add_argument('--lang', choices=('en', 'ru'), default='en', help="Язык заголовков синтетических новостей")
+    parser.add_argument('--description-chars', type=int, default=600, help="Длина описания новости")
+    parser.add_argument('--top-count', type=int, default=10, help="Количество топ-новостей")
+    parser.add_argument('--config', default='config.yaml', help="Путь к config.yaml")
+    parser.add_argument('--text-format', action='store_true', help="Нумерованные списки вместо JSON по схеме")
+    parser.add_argument('--max-in-flight', type=int, help="Одновременных запросов к LLM")
+    parser.add_argument('--requests-per-minute', type=float, help="Лимит запросов в минуту")
+    parser.add_argument('--tokens-per-minute', type=float, help="Лимит токенов в минуту")
+    parser.add_argument('--base-url', help="Внешний OpenAI-совместимый сервер (иначе mock в этом процессе)")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    # summarizer при импорте настраивает корневой логгер на INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    for result in asyncio.run(run_benchmark(args)):
+        print_result(result)
+
+
+if __name__ == '__main__':
+    main()
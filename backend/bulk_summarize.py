@@ -0,0 +1,160 @@
+"""
+Массовая пересуммаризация новостей хранилища асинхронным пакетным заданием (Batch API)
+
+Например, после изменения промпта:
+    python bulk_summarize.py run                      # отправить, дождаться и записать результаты
+    python bulk_summarize.py submit --limit 5000      # только отправить задание
+    python bulk_summarize.py status batch_abc123
+    python bulk_summarize.py collect batch_abc123     # дождаться и записать результаты
+    python bulk_summarize.py collect batch_abc123 --resubmit  # и отправить заново новости неудачных запросов
+
+Проверка без расхода токенов: python mock_openai.py --port 8001 и --base-url http://127.0.0.1:8001/v1
+"""
+import argparse
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from news_store import NewsStore
+from summarizer import NewsSummarizer
+
+logger = logging.getLogger(__name__)
+
+
+def load_config(path: str, base_url: Optional[str] = None) -> Dict[str, Any]:
+    """Загрузка config.yaml с необязательной заменой адреса API"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    if base_url:
+        config['api'].setdefault('openai', {})['base_url'] = base_url
+    return config
+
+
+def open_store(config: Dict[str, Any]) -> NewsStore:
+    """Хранилище новостей из config.yaml"""
+    return NewsStore(
+        config['news'].get('store_path', 'output/news_store.db'),
+        max_age_days=config['news'].get('store_max_age_days', 7)
+    )
+
+
+async def submit(summarizer: NewsSummarizer, store: NewsStore, limit: Optional[int] = None,
+                 news_ids: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Отправка задания для новостей хранилища
+
+    Args:
+        summarizer: Суммаризатор
+        store: Хранилище новостей
+        limit: Только последние limit новостей
+        news_ids: Только новости с этими id (например, из неудачных запросов прошлого задания)
+
+    Returns:
+        Описание задания или None, если отправлять нечего
+    """
+    news_list = list(store.load(news_ids).values()) if news_ids is not None else store.load_all()
+    if limit:
+        news_list = news_list[-limit:]
+    return await summarizer.submit_bulk_job(news_list)
+
+
+async def collect(summarizer: NewsSummarizer, store: NewsStore, batch_id: str) -> Tuple[int, List[str]]:
+    """
+    Ожидание задания и запись результатов в хранилище по мере чтения
+
+    Args:
+        summarizer: Суммаризатор
+        store: Хранилище новостей
+        batch_id: Идентификатор задания
+
+    Returns:
+        Кортеж (количество обновленных новостей, id новостей из неудачных запросов)
+    """
+    batch = await summarizer.wait_bulk_job(batch_id)
+    logger.info(f"Задание {batch_id} завершено со статусом {batch.status}")
+
+    updated = 0
+    outcomes: Dict[str, str] = {}
+    async for results in summarizer.iter_bulk_results(batch, outcomes):
+        news_list = list(store.load(list(results)).values())
+        updated += store.update(summarizer.apply_bulk_results(news_list, results))
+    logger.info(f"Обновлено {updated} новостей в хранилище")
+    return updated, summarizer.record_bulk_failures(batch_id, outcomes)
+
+
+async def collect_and_resubmit(summarizer: NewsSummarizer, store: NewsStore, batch_id: str,
+                               resubmit: bool) -> Optional[Dict[str, Any]]:
+    """
+    Сбор результатов задания и, если нужно, отправка нового задания для неудачных запросов
+
+    Returns:
+        Описание нового задания или None
+    """
+    _, failed_ids = await collect(summarizer, store, batch_id)
+    if not failed_ids:
+        return None
+    if not resubmit:
+        print(f"Новостей из неудачных запросов: {len(failed_ids)} "
+              f"(отправить заново: collect {batch_id} --resubmit)")
+        return None
+    job = await submit(summarizer, store, news_ids=failed_ids)
+    if job:
+        print(f"Повторное задание {job['batch_id']}: {job['items']} новостей, {job['requests']} запросов")
+    return job
+
+
+async def run(args: argparse.Namespace):
+    """Выполнение команды"""
+    config = load_config(args.config, args.base_url)
+    summarizer = NewsSummarizer(config['api'])
+    store = open_store(config)
+    try:
+        if args.command == 'status':
+            batch = await summarizer.client.batches.retrieve(args.batch_id)
+            print(f"{batch.id}: {batch.status}, запросов {batch.request_counts}")
+        elif args.command == 'submit':
+            job = await submit(summarizer, store, args.limit)
+            if job:
+                print(f"Задание {job['batch_id']}: {job['items']} новостей, {job['requests']} запросов")
+        elif args.command == 'collect':
+            await collect_and_resubmit(summarizer, store, args.batch_id, args.resubmit)
+        else:
+            job = await submit(summarizer, store, args.limit)
+            if job:
+                # Повторное задание для неудачных запросов тоже дожидается результатов (один раз)
+                retry_job = await collect_and_resubmit(summarizer, store, job['batch_id'], args.resubmit)
+                if retry_job:
+                    await collect_and_resubmit(summarizer, store, retry_job['batch_id'], False)
+    finally:
+        store.close()
+        summarizer.close()
+        await summarizer.client.close()
+
+
+def main():
+    """Точка входа"""
+    parser = argparse.ArgumentParser(description="Пересуммаризация хранилища новостей пакетным заданием")
+    parser.add_argument('--config', default='config.yaml', help="Путь к config.yaml")
+    parser.add_argument('--base-url', help="OpenAI-совместимый сервер вместо api.openai.base_url")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in (('run', "Отправить задание, дождаться и записать результаты"),
+                               ('submit', "Отправить задание")):
+        command_parser = subparsers.add_parser(command, help=help_text)
+        command_parser.add_argument('--limit', type=int, help="Только последние N новостей")
+    for command, help_text in (('status', "Состояние задания"),
+                               ('collect', "Дождаться задания и записать результаты")):
+        subparsers.add_parser(command, help=help_text).add_argument('batch_id', help="Идентификатор задания")
+    for command in ('run', 'collect'):
+        subparsers.choices[command].add_argument(
+            '--resubmit', action='store_true', help="Отправить заново новости из неудачных запросов"
+        )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Очистка и сокращение описаний новостей до заданного бюджета токенов
+"""
+import html
+import re
+
+# Среднее количество символов на токен для кириллицы и латиницы
+CHARS_PER_TOKEN_CYRILLIC = 2.5
+CHARS_PER_TOKEN_LATIN = 4.0
+
+BLOCK_TAGS_RE = re.compile(r'<(script|style|noscript|iframe|figure|figcaption)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+BREAK_TAGS_RE = re.compile(r'<\s*(br|/p|/div|/li|/h\d)\b[^>]*>', re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]+>')
+WHITESPACE_RE = re.compile(r'\s+')
+CYRILLIC_RE = re.compile(r'[Ѐ-ӿ]')
+SENTENCE_END_RE = re.compile(r'[.!?…](?=\s)')
+
+# Служебные хвосты, которые ленты добавляют к описаниям. Ссылки "Читать далее" и т.п.
+# удаляются, только если стоят в самом конце текста (с заглавной буквы и не более чем
+# с несколькими знаками вроде → » ...), чтобы не обрезать обычные фразы в тексте
+BOILERPLATE_RE = re.compile(
+    r'(The post .{0,200} appeared first on .{0,100}\.?'
+    r'|(?-i:Continue reading|Read more|Читать далее|Читать полностью|Подробнее)\W{0,5}$)',
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Приблизительная оценка количества токенов в тексте
+
+    Args:
+        text: Текст
+
+    Returns:
+        Оценка количества токенов
+    """
+    if not text:
+        return 0
+    cyrillic = len(CYRILLIC_RE.findall(text))
+    other = len(text) - cyrillic
+    return int(cyrillic / CHARS_PER_TOKEN_CYRILLIC + other / CHARS_PER_TOKEN_LATIN) + 1
+
+
+def strip_markup(text: str) -> str:
+    """
+    Удаление HTML разметки, служебных хвостов и лишних пробелов
+
+    Args:
+        text: Описание новости из ленты
+
+    Returns:
+        Чистый текст
+    """
+    if not text:
+        return ''
+
+    text = BLOCK_TAGS_RE.sub(' ', text)
+    text = BREAK_TAGS_RE.sub(' ', text)
+    text = TAG_RE.sub(' ', text)
+    text = html.unescape(text)
+    text = WHITESPACE_RE.sub(' ', text).strip()
+    return BOILERPLATE_RE.sub('', text).strip()
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Обрезка текста до бюджета токенов по границе предложения или слова
+
+    Args:
+        text: Текст
+        max_tokens: Максимальное количество токенов
+
+    Returns:
+        Обрезанный текст
+    """
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+
+    # Подбираем длину по средней плотности токенов текста
+    max_chars = int(len(text) * max_tokens / estimate_tokens(text))
+    cut = text[:max_chars]
+
+    sentence_ends = [m.end() for m in SENTENCE_END_RE.finditer(cut)]
+    if sentence_ends and sentence_ends[-1] > max_chars // 2:
+        return cut[:sentence_ends[-1]]
+
+    space = cut.rfind(' ')
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip(' ,;:-—') + '…'
+
+
+def compact_description(text: str, max_tokens: int) -> str:
+    """
+    Подготовка описания новости для промптов и API
+
+    Args:
+        text: Описание новости из ленты (может содержать HTML)
+        max_tokens: Бюджет токенов (0 - без ограничения длины)
+
+    Returns:
+        Очищенное и сокращенное описание
+    """
+    return truncate_to_tokens(strip_markup(text), max_tokens)
@@ -0,0 +1,158 @@
+"""
+Обнаружение почти одинаковых новостей из разных источников (SimHash)
+"""
+import hashlib
+import logging
+import re
+from typing import Dict, Any, List, Set
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+# Длина, до которой обрезаются слова (грубый стемминг для русских словоформ)
+STEM_LENGTH = 6
+
+TAG_RE = re.compile(r'<[^>]+>')
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(text: str) -> List[str]:
+    """Нормализованные слова текста без разметки"""
+    text = TAG_RE.sub(' ', text or '').lower().replace('ё', 'е')
+    return [word[:STEM_LENGTH] for word in WORD_RE.findall(text) if len(word) > 2 and not word.isdigit()]
+
+
+def simhash(text: str) -> int:
+    """
+    64-битный SimHash отпечаток текста по словам и парам слов
+
+    Args:
+        text: Текст новости
+
+    Returns:
+        Отпечаток текста
+    """
+    tokens = _tokens(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not features:
+        return 0
+
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'big')
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Количество различающихся битов двух отпечатков"""
+    return bin(a ^ b).count('1')
+
+
+def news_fingerprint(news_item: Dict[str, Any]) -> int:
+    """
+    Отпечаток новости по заголовку и описанию
+
+    Отпечаток сохраняется в поле simhash, чтобы сравнение работало
+    и после перевода заголовка суммаризатором.
+
+    Args:
+        news_item: Новость
+
+    Returns:
+        Отпечаток новости
+    """
+    if not news_item.get('simhash'):
+        text = f"{news_item.get('title', '')} {news_item.get('description', '')}"
+        news_item['simhash'] = format(simhash(text), '016x')
+    return int(news_item['simhash'], 16)
+
+
+def _split_blocks(fingerprint: int, blocks: int) -> List[int]:
+    """
+    Разбиение отпечатка на блоки для поиска кандидатов
+
+    Если расстояние Хэмминга меньше количества блоков, хотя бы один блок
+    у двух отпечатков совпадает полностью.
+    """
+    bounds = [FINGERPRINT_BITS * i // blocks for i in range(blocks + 1)]
+    return [
+        (fingerprint >> start) & ((1 << (end - start)) - 1)
+        for start, end in zip(bounds, bounds[1:])
+    ]
+
+
+def _add_alternate(representative: Dict[str, Any], duplicate: Dict[str, Any]):
+    """Добавление дубликата в список альтернативных источников"""
+    alternates = representative.setdefault('alternate_sources', [])
+    known_links = {alt.get('link') for alt in alternates}
+    candidates = [{
+        'source': duplicate.get('source', ''),
+        'link': duplicate.get('link', ''),
+        'source_url': duplicate.get('source_url', '')
+    }] + duplicate.get('alternate_sources', [])
+
+    for alt in candidates:
+        if alt['link'] != representative.get('link') and alt['link'] not in known_links:
+            alternates.append(alt)
+            known_links.add(alt['link'])
+
+
+def deduplicate_news(news_list: List[Dict[str, Any]], max_distance: int = 6) -> List[Dict[str, Any]]:
+    """
+    Схлопывание почти одинаковых новостей
+
+    Из каждой группы дубликатов остается первая новость, а остальные
+    попадают в ее поле alternate_sources.
+
+    Args:
+        news_list: Список новостей
+        max_distance: Максимальное расстояние Хэмминга между отпечатками дубликатов
+
+    Returns:
+        Список новостей без дубликатов в исходном порядке
+    """
+    block_count = max_distance + 1
+    buckets: List[Dict[int, List[int]]] = [{} for _ in range(block_count)]
+    representatives: List[Dict[str, Any]] = []
+    fingerprints: List[int] = []
+
+    for news in news_list:
+        fingerprint = news_fingerprint(news)
+        blocks = _split_blocks(fingerprint, block_count)
+
+        candidates: Set[int] = set()
+        if fingerprint:
+            for i, block in enumerate(blocks):
+                candidates.update(buckets[i].get(block, []))
+
+        match = None
+        for index in sorted(candidates):
+            rep = representatives[index]
+            if rep.get('link') != news.get('link') and rep.get('source_url') == news.get('source_url'):
+                continue
+            if hamming_distance(fingerprints[index], fingerprint) <= max_distance:
+                match = index
+                break
+
+        if match is not None:
+            _add_alternate(representatives[match], news)
+            continue
+
+        index = len(representatives)
+        representatives.append(news)
+        fingerprints.append(fingerprint)
+        for i, block in enumerate(blocks):
+            buckets[i].setdefault(block, []).append(index)
+
+    collapsed = len(news_list) - len(representatives)
+    if collapsed:
+        logger.info(f"Схлопнуто {collapsed} дубликатов, осталось {len(representatives)} новостей")
+    return representatives
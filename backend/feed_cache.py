@@ -0,0 +1,146 @@
+"""
+Персистентный кэш RSS лент для условных запросов (ETag / Last-Modified)
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FeedCache:
+    """
+    Хранит для каждой ленты ETag, Last-Modified, хэш содержимого и последние новости
+
+    Обновления после загрузки измененной ленты откладываются в pending и
+    применяются commit() только после успешной обработки ее новостей, поэтому
+    при сбое обработки лента в следующий раз снова считается измененной.
+    """
+
+    def __init__(self, path: str = 'output/feed_cache.json'):
+        """
+        Инициализация кэша
+
+        Args:
+            path: Путь к JSON файлу кэша
+        """
+        self.path = Path(path)
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self):
+        """Загрузка кэша с диска"""
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.records = json.load(f)
+            logger.info(f"Загружен кэш лент: {len(self.records)} записей")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки кэша лент: {e}")
+            self.records = {}
+
+    def save(self):
+        """Сохранение кэша на диск"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.records, f, ensure_ascii=False)
+            tmp_path.replace(self.path)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения кэша лент: {e}")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Получить запись кэша для ленты
+
+        Args:
+            url: URL RSS ленты
+
+        Returns:
+            Запись кэша или None
+        """
+        return self.records.get(url)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Заголовки условного запроса для ленты
+
+        Args:
+            url: URL RSS ленты
+
+        Returns:
+            Словарь с If-None-Match / If-Modified-Since (может быть пустым)
+        """
+        record = self.records.get(url)
+        if not record:
+            return {}
+
+        headers = {}
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('last_modified'):
+            headers['If-Modified-Since'] = record['last_modified']
+        return headers
+
+    def cached_news(self, url: str) -> List[Dict[str, Any]]:
+        """
+        Копия новостей, сохраненных при последнем изменении ленты
+
+        Args:
+            url: URL RSS ленты
+
+        Returns:
+            Список новостей
+        """
+        record = self.records.get(url) or {}
+        return [dict(item) for item in record.get('news', [])]
+
+    def update(self, url: str, content_hash: str, news: List[Dict[str, Any]],
+               etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        Отложенное обновление записи кэша после загрузки измененной ленты (применяется commit)
+
+        Args:
+            url: URL RSS ленты
+            content_hash: Хэш тела ответа
+            news: Распарсенные новости
+            etag: Значение заголовка ETag
+            last_modified: Значение заголовка Last-Modified
+        """
+        self.pending[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': content_hash,
+            'news': [dict(item) for item in news],
+            'updated_at': datetime.now().isoformat()
+        }
+
+    def commit(self, urls: List[str]) -> int:
+        """
+        Применение отложенных обновлений лент после успешной обработки их новостей
+
+        Args:
+            urls: URL лент, новости которых обработаны
+
+        Returns:
+            Количество примененных обновлений
+        """
+        committed = 0
+        for url in urls:
+            record = self.pending.pop(url, None)
+            if record is not None:
+                self.records[url] = record
+                committed += 1
+        return committed
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        """Хэш тела ответа для обнаружения неизмененных лент"""
+        return hashlib.sha256(content).hexdigest()
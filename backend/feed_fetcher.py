@@ -0,0 +1,100 @@
+"""
+Асинхронная загрузка RSS лент через общий пул HTTP соединений
+"""
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "NewsAggregator/1.0 (+https://github.com/I0n3w4yI/NewsAgregatorHH)"
+
+
+class FeedFetcher:
+    """Загрузчик RSS лент с глобальным и per-host ограничением параллельности"""
+
+    def __init__(self, max_concurrency: int = 10, per_host_limit: int = 2,
+                 timeout: float = 10.0, user_agent: str = DEFAULT_USER_AGENT,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Инициализация загрузчика
+
+        Args:
+            max_concurrency: Максимальное количество одновременных запросов
+            per_host_limit: Максимальное количество одновременных запросов к одному хосту
+            timeout: Таймаут одного запроса в секундах
+            user_agent: Заголовок User-Agent для запросов
+            transport: HTTP транспорт (например, ReplayTransport для офлайн воспроизведения лент)
+        """
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Ленивое создание общего HTTP клиента с пулом соединений"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                headers={'User-Agent': self.user_agent},
+                follow_redirects=True,
+                transport=self.transport
+            )
+        return self._client
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Семафор для ограничения запросов к одному хосту"""
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Загрузка содержимого RSS ленты
+
+        Args:
+            url: URL RSS ленты
+            headers: Дополнительные заголовки (например, для условного запроса)
+
+        Returns:
+            Словарь со статусом ответа, телом и заголовками ETag / Last-Modified.
+            При ответе 304 Not Modified тело равно None
+
+        Raises:
+            httpx.HTTPError: При сетевой ошибке, таймауте или неуспешном статусе
+        """
+        async with self._semaphore:
+            async with self._get_host_semaphore(url):
+                response = await self._get_client().get(url, headers=headers)
+
+        if response.status_code == 304:
+            content = None
+        else:
+            response.raise_for_status()
+            content = response.content
+
+        return {
+            'status': response.status_code,
+            'content': content,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+
+    async def close(self):
+        """Закрытие HTTP клиента и его пула соединений"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
@@ -0,0 +1,190 @@
+"""
+Воспроизведение записанных и синтетических RSS лент без обращения к сети
+
+Запись живых лент в каталог фикстур:
+    python feed_replay.py record --out fixtures/feeds
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional
+
+import httpx
+import yaml
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """HTTP транспорт, отдающий заранее сохраненные ленты с искусственной задержкой"""
+
+    def __init__(self, payloads: Dict[str, bytes], latency: float = 0.0, jitter: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Инициализация транспорта
+
+        Args:
+            payloads: Содержимое лент по URL
+            latency: Базовая задержка ответа в секундах
+            jitter: Максимальная случайная добавка к задержке в секундах
+            seed: Зерно генератора случайных задержек (для воспроизводимых замеров)
+        """
+        self.payloads = payloads
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Ответ на запрос ленты (поддерживает If-None-Match)"""
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        payload = self.payloads.get(str(request.url))
+        if payload is None:
+            return httpx.Response(404, request=request)
+
+        etag = '"' + hashlib.sha1(payload).hexdigest()[:16] + '"'
+        if request.headers.get('If-None-Match') == etag:
+            return httpx.Response(304, headers={'ETag': etag}, request=request)
+
+        return httpx.Response(
+            200,
+            content=payload,
+            headers={'ETag': etag, 'Content-Type': 'application/rss+xml; charset=utf-8'},
+            request=request
+        )
+
+
+def load_recorded_feeds(directory: str) -> Dict[str, bytes]:
+    """
+    Загрузка записанных лент из каталога фикстур
+
+    Args:
+        directory: Каталог с index.json и файлами лент
+
+    Returns:
+        Содержимое лент по URL
+    """
+    base = Path(directory)
+    with open(base / INDEX_FILE, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    return {url: (base / filename).read_bytes() for url, filename in index.items()}
+
+
+async def record_feeds(sources_by_category: Dict[str, List[Dict[str, str]]], directory: str,
+                       timeout: float = 15.0) -> int:
+    """
+    Запись живых лент в каталог фикстур
+
+    Args:
+        sources_by_category: Словарь источников по категориям
+        directory: Каталог для сохранения
+        timeout: Таймаут одного запроса в секундах
+
+    Returns:
+        Количество записанных лент
+    """
+    base = Path(directory)
+    base.mkdir(parents=True, exist_ok=True)
+    urls = [
+        source['url'] for sources in sources_by_category.values()
+        for source in sources if source.get('url')
+    ]
+
+    index = {}
+    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+        responses = await asyncio.gather(*(client.get(url) for url in urls), return_exceptions=True)
+
+    for url, response in zip(urls, responses):
+        if isinstance(response, Exception) or response.status_code != 200:
+            logger.error(f"Не удалось записать {url}: {response}")
+            continue
+        filename = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.xml'
+        (base / filename).write_bytes(response.content)
+        index[url] = filename
+
+    with open(base / INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"Записано {len(index)} лент из {len(urls)} в {base}")
+    return len(index)
+
+
+def generate_feed(feed_index: int, items: int, description_chars: int) -> bytes:
+    """
+    Синтетическая RSS 2.0 лента заданного размера
+
+    Args:
+        feed_index: Номер ленты (для уникальных ссылок)
+        items: Количество записей
+        description_chars: Примерная длина HTML описания каждой записи
+
+    Returns:
+        Содержимое ленты
+    """
+    sentence = 'Компания объявила о новых результатах исследования, опубликованных в журнале. '
+    body = (sentence * (description_chars // len(sentence) + 1))[:description_chars]
+    entries = []
+    for i in range(items):
+        entries.append(
+            f"<item><title>Синтетическая новость {feed_index}-{i}</title>"
+            f"<link>https://feeds.example/{feed_index}/news/{i}</link>"
+            f"<guid>feed-{feed_index}-item-{i}</guid>"
+            f"<description><![CDATA[<p>{body}</p><img src=\"https://feeds.example/{i}.jpg\"/>]]></description>"
+            f"<pubDate>Mon, 06 Sep 2021 {i % 24:02d}:{i % 60:02d}:00 +0300</pubDate></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+        f'<title>Лента {feed_index}</title><link>https://feeds.example/{feed_index}</link>'
+        + ''.join(entries) + '</channel></rss>'
+    ).encode('utf-8')
+
+
+def synthetic_sources(feeds: int, items: int, description_chars: int,
+                      categories: int = 6) -> Tuple[Dict[str, List[Dict[str, str]]], Dict[str, bytes]]:
+    """
+    Набор синтетических источников и их лент
+
+    Args:
+        feeds: Количество лент
+        items: Количество записей в каждой ленте
+        description_chars: Примерная длина описания записи
+        categories: Количество категорий
+
+    Returns:
+        Кортеж (источники по категориям в формате config.yaml, содержимое лент по URL)
+    """
+    sources_by_category: Dict[str, List[Dict[str, str]]] = {}
+    payloads = {}
+    for i in range(feeds):
+        url = f"https://feeds.example/{i}/rss"
+        category = f"категория-{i % categories}"
+        sources_by_category.setdefault(category, []).append({'url': url, 'name': f"Лента {i}"})
+        payloads[url] = generate_feed(i, items, description_chars)
+    return sources_by_category, payloads
+
+
+def main():
+    """Точка входа: запись живых лент в каталог фикстур"""
+    parser = argparse.ArgumentParser(description="Запись RSS лент для офлайн воспроизведения")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record = subparsers.add_parser('record', help="Записать ленты из config.yaml")
+    record.add_argument('--config', default='config.yaml', help="Путь к config.yaml")
+    record.add_argument('--out', default='fixtures/feeds', help="Каталог фикстур")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    asyncio.run(record_feeds(config['rss_sources'], args.out))
+
+
+if __name__ == '__main__':
+    main()
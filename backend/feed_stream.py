@@ -0,0 +1,129 @@
+"""
+Потоковый парсер RSS/Atom лент с ранней остановкой
+"""
+import html
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional
+from xml.etree import ElementTree
+
+from news_store import make_news_id
+
+logger = logging.getLogger(__name__)
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+RSS1_NS = '{http://purl.org/rss/1.0/}'
+DC_NS = '{http://purl.org/dc/elements/1.1/}'
+CONTENT_NS = '{http://purl.org/rss/1.0/modules/content/}'
+
+ITEM_TAGS = ('item', RSS1_NS + 'item', ATOM_NS + 'entry')
+CHUNK_SIZE = 16 * 1024
+
+
+def _child_text(element: ElementTree.Element, *tags: str) -> str:
+    """Текст первого найденного дочернего элемента (HTML сущности раскрываются, как в feedparser)"""
+    for tag in tags:
+        child = element.find(tag)
+        if child is not None and child.text and child.text.strip():
+            return html.unescape(child.text.strip())
+    return ''
+
+
+def _atom_link(entry: ElementTree.Element) -> str:
+    """Ссылка на новость из Atom записи (rel="alternate" или без rel)"""
+    for link in entry.findall(ATOM_NS + 'link'):
+        if link.get('rel', 'alternate') == 'alternate' and link.get('href'):
+            return link.get('href')
+    return ''
+
+
+def _parse_date(value: str) -> str:
+    """
+    Парсинг даты публикации в формате RFC 822 или ISO 8601
+
+    Args:
+        value: Дата из ленты
+
+    Returns:
+        Дата в UTC в формате '%Y-%m-%d %H:%M:%S'
+    """
+    dt: Optional[datetime] = None
+    if value:
+        try:
+            dt = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            try:
+                dt = datetime.fromisoformat(value)
+            except ValueError:
+                dt = None
+
+    if dt is None:
+        dt = datetime.now()
+    elif dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _build_news_item(element: ElementTree.Element, url: str, source_name: str) -> Dict[str, Any]:
+    """Преобразование элемента item/entry в словарь новости"""
+    if element.tag == ATOM_NS + 'entry':
+        guid = _child_text(element, ATOM_NS + 'id')
+        link = _atom_link(element)
+        title = _child_text(element, ATOM_NS + 'title')
+        description = _child_text(element, ATOM_NS + 'summary', ATOM_NS + 'content')
+        published = _child_text(element, ATOM_NS + 'published', ATOM_NS + 'updated')
+    else:
+        ns = RSS1_NS if element.tag.startswith(RSS1_NS) else ''
+        guid = _child_text(element, 'guid') or element.get('{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about', '')
+        link = _child_text(element, ns + 'link')
+        title = _child_text(element, ns + 'title')
+        description = _child_text(element, ns + 'description', CONTENT_NS + 'encoded')
+        published = _child_text(element, 'pubDate', DC_NS + 'date')
+
+    return {
+        'id': make_news_id(guid, link),
+        'title': title or 'Без заголовка',
+        'link': link,
+        'description': description,
+        'published': _parse_date(published),
+        'source': source_name,
+        'source_url': url
+    }
+
+
+def parse_feed_stream(content: bytes, url: str, source_name: str, max_news: int) -> List[Dict[str, Any]]:
+    """
+    Потоковый парсинг ленты, останавливающийся после max_news записей
+
+    Дерево всей ленты не строится: документ подается парсеру частями,
+    обработанные записи сразу очищаются, а разбор прекращается, как только
+    набрано нужное количество новостей.
+
+    Args:
+        content: Содержимое ленты в байтах
+        url: URL RSS ленты
+        source_name: Название источника
+        max_news: Максимальное количество новостей
+
+    Returns:
+        Список новостей из источника
+
+    Raises:
+        xml.etree.ElementTree.ParseError: Если лента не является корректным XML
+    """
+    parser = ElementTree.XMLPullParser(events=('end',))
+    news_list: List[Dict[str, Any]] = []
+
+    for offset in range(0, len(content), CHUNK_SIZE):
+        parser.feed(content[offset:offset + CHUNK_SIZE])
+        for _, element in parser.read_events():
+            if element.tag not in ITEM_TAGS:
+                continue
+            news_list.append(_build_news_item(element, url, source_name))
+            element.clear()
+            if len(news_list) >= max_news:
+                return news_list
+
+    parser.close()
+    return news_list
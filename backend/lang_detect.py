@@ -0,0 +1,159 @@
+"""
+Быстрое определение языка текста по письменности с мемоизацией
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Символы, не являющиеся буквами
+NON_LETTERS_RE = re.compile(r'[\W\d_]+')
+
+# Диапазоны письменностей в порядке частоты в лентах: обычно буквы
+# заканчиваются уже после кириллицы и латиницы. Латиница ограничена ASCII,
+# как и в прежней проверке на русский текст.
+SCRIPT_PATTERNS: Tuple[Tuple[str, re.Pattern], ...] = tuple(
+    (script, re.compile(f'[{chars}]+'))
+    for script, chars in (
+        ('cyrillic', '\u0400-\u04ff'),
+        ('latin', 'A-Za-z'),
+        ('greek', '\u0370-\u03ff'),
+        ('hebrew', '\u0590-\u05ff'),
+        ('arabic', '\u0600-\u06ff'),
+        ('devanagari', '\u0900-\u097f'),
+        ('kana', '\u3040-\u30ff'),
+        ('han', '\u4e00-\u9fff'),
+        ('hangul', '\uac00-\ud7af'),
+    )
+)
+
+# Язык, который считается основным для письменности
+SCRIPT_LANGUAGES: Dict[str, str] = {
+    'cyrillic': 'ru',
+    'latin': 'en',
+    'greek': 'el',
+    'hebrew': 'he',
+    'arabic': 'ar',
+    'devanagari': 'hi',
+    'kana': 'ja',
+    'han': 'zh',
+    'hangul': 'ko',
+}
+
+# Письменность языка (для проверки соответствия целевому языку)
+LANGUAGE_SCRIPTS: Dict[str, str] = {
+    'ru': 'cyrillic', 'uk': 'cyrillic', 'be': 'cyrillic', 'bg': 'cyrillic', 'sr': 'cyrillic', 'kk': 'cyrillic',
+    'en': 'latin', 'de': 'latin', 'fr': 'latin', 'es': 'latin', 'it': 'latin', 'pt': 'latin', 'pl': 'latin',
+    'el': 'greek',
+    'he': 'hebrew',
+    'ar': 'arabic', 'fa': 'arabic',
+    'hi': 'devanagari',
+    'ja': 'kana',
+    'zh': 'han',
+    'ko': 'hangul',
+}
+
+# Минимальная доля букв целевой письменности, при которой текст считается написанным на целевом языке
+MIN_SCRIPT_SHARE = 0.3
+
+
+@lru_cache(maxsize=65536)
+def script_counts(text: str) -> Tuple[Tuple[str, int], ...]:
+    """
+    Количество букв каждой письменности в тексте (результат кэшируется)
+
+    Args:
+        text: Текст
+
+    Returns:
+        Пары (письменность, количество букв), по убыванию количества
+    """
+    counts: Counter = Counter()
+    # Подсчет без цикла по символам: из строки букв последовательно удаляются
+    # буквы каждой письменности, пока буквы не закончатся
+    rest = NON_LETTERS_RE.sub('', text)
+    for script, pattern in SCRIPT_PATTERNS:
+        if not rest:
+            break
+        remaining = pattern.sub('', rest)
+        if len(remaining) < len(rest):
+            counts[script] = len(rest) - len(remaining)
+        rest = remaining
+    if rest:
+        counts['other'] = len(rest)
+    return tuple(counts.most_common())
+
+
+def detect_language(text: str) -> Optional[str]:
+    """
+    Определение языка по преобладающей письменности
+
+    Для письменностей, общих для нескольких языков, возвращается основной язык
+    (кириллица - 'ru', латиница - 'en').
+
+    Args:
+        text: Текст
+
+    Returns:
+        Код языка или None, если в тексте нет букв или письменность не распознана
+    """
+    if not text:
+        return None
+    counts = script_counts(text)
+    if not counts:
+        return None
+    return SCRIPT_LANGUAGES.get(counts[0][0])
+
+
+def is_language(text: str, language: str = 'ru') -> bool:
+    """
+    Проверка, написан ли текст на заданном языке
+
+    Текст без букв считается написанным на любом языке. Текст не считается
+    написанным на языке, если букв другой письменности в нем больше.
+
+    Args:
+        text: Текст
+        language: Код целевого языка
+
+    Returns:
+        True если текст на целевом языке
+    """
+    if not text:
+        return True
+    counts = dict(script_counts(text))
+    total = sum(counts.values())
+    if total == 0:
+        return True
+
+    target = counts.get(LANGUAGE_SCRIPTS.get(language, ''), 0)
+    if any(count > target for script, count in counts.items() if script != 'other'):
+        return False
+    return target / total > MIN_SCRIPT_SHARE
+
+
+def detect_languages(texts: List[str]) -> List[Optional[str]]:
+    """
+    Пакетное определение языка списка текстов
+
+    Args:
+        texts: Тексты
+
+    Returns:
+        Коды языков в порядке текстов
+    """
+    return [detect_language(text) for text in texts]
+
+
+def filter_not_language(texts: List[str], language: str = 'ru') -> List[int]:
+    """
+    Индексы текстов, написанных не на заданном языке
+
+    Args:
+        texts: Тексты
+        language: Код целевого языка
+
+    Returns:
+        Индексы текстов, требующих перевода
+    """
+    return [i for i, text in enumerate(texts) if not is_language(text, language)]
@@ -0,0 +1,208 @@
+"""
+Учет запросов к LLM: токены, задержки, повторы и стоимость по этапам обработки
+"""
+import contextlib
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+
+# Прогон обработки, к которому относятся запросы текущей задачи asyncio
+_current_run: ContextVar[Optional[Dict[str, Any]]] = ContextVar('llm_metrics_run', default=None)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль q (0..100) по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def format_total(total: Dict[str, Any]) -> str:
+    """Краткое описание суммарных показателей для лога"""
+    return (
+        f"запросов {total['calls']} (ошибок {total['errors']}, повторов {total['retries']}), "
+        f"токены {total['prompt_tokens']}+{total['completion_tokens']}, стоимость ${total['cost']:.4f}"
+    )
+
+
+class StageStats:
+    """Агрегированные показатели запросов одного этапа"""
+
+    def __init__(self, max_samples: int = 1000):
+        """
+        Инициализация
+
+        Args:
+            max_samples: Количество последних задержек для расчета перцентилей
+        """
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedged = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_total = 0.0
+        self.latencies: Deque[float] = deque(maxlen=max_samples)
+
+    def add(self, prompt_tokens: int, completion_tokens: int, latency: float, retries: int,
+            hedged: bool, outcome: str):
+        """Учет одного запроса"""
+        self.calls += 1
+        self.errors += outcome != 'ok'
+        self.retries += retries
+        self.hedged += hedged
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.latency_total += latency
+        self.latencies.append(latency)
+
+    def to_dict(self, prompt_price: float, completion_price: float) -> Dict[str, Any]:
+        """
+        Показатели этапа для API
+
+        Args:
+            prompt_price: Цена миллиона токенов запроса
+            completion_price: Цена миллиона токенов ответа
+
+        Returns:
+            Словарь показателей
+        """
+        latencies = list(self.latencies)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'hedged': self.hedged,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'latency_total': round(self.latency_total, 3),
+            'latency_p50': round(percentile(latencies, 50), 3),
+            'latency_p95': round(percentile(latencies, 95), 3),
+            'latency_p99': round(percentile(latencies, 99), 3),
+            'cost': round(
+                (self.prompt_tokens * prompt_price + self.completion_tokens * completion_price) / 1_000_000, 6
+            ),
+        }
+
+
+class LLMMetrics:
+    """Показатели запросов к LLM по этапам: за все время и по отдельным прогонам обработки"""
+
+    def __init__(self, prompt_price: float = 0.0, completion_price: float = 0.0, history: int = 20,
+                 max_samples: int = 1000):
+        """
+        Инициализация
+
+        Args:
+            prompt_price: Цена миллиона токенов запроса
+            completion_price: Цена миллиона токенов ответа
+            history: Количество хранимых последних прогонов
+            max_samples: Количество последних задержек этапа для расчета перцентилей
+        """
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.totals: Dict[str, StageStats] = {}
+        self.runs: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.max_samples = max_samples
+
+    @contextlib.contextmanager
+    def run(self, kind: str) -> Iterator[Dict[str, Any]]:
+        """
+        Прогон обработки: запросы внутри блока (и его задач asyncio) учитываются в нем
+
+        Args:
+            kind: Тип прогона (refresh, poll, cli, ...)
+
+        Yields:
+            Запись прогона
+        """
+        record = {
+            'id': uuid.uuid4().hex[:12],
+            'kind': kind,
+            'started_at': datetime.now().isoformat(),
+            'finished_at': None,
+            'duration': None,
+            'stages': {},
+        }
+        self.runs.append(record)
+        token = _current_run.set(record)
+        start_time = time.monotonic()
+        try:
+            yield record
+        finally:
+            _current_run.reset(token)
+            record['finished_at'] = datetime.now().isoformat()
+            record['duration'] = round(time.monotonic() - start_time, 3)
+
+    def record(self, stage: str, response: Any = None, latency: float = 0.0, retries: int = 0,
+               hedged: bool = False, outcome: str = 'ok'):
+        """
+        Учет одного запроса к LLM
+
+        Args:
+            stage: Этап обработки (summary_batch, title_translation, ...)
+            response: Ответ API (токены берутся из response.usage)
+            latency: Длительность запроса с учетом повторов в секундах
+            retries: Количество повторов
+            hedged: Отправлялся ли дублирующий запрос
+            outcome: ok или имя класса исключения
+        """
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+
+        targets = [self.totals]
+        current = _current_run.get()
+        if current is not None:
+            targets.append(current['stages'])
+        for stages in targets:
+            stages.setdefault(stage, StageStats(self.max_samples)).add(
+                prompt_tokens, completion_tokens, latency, retries, hedged, outcome
+            )
+
+    def _stages_dict(self, stages: Dict[str, StageStats]) -> Dict[str, Any]:
+        """Показатели этапов и их сумма"""
+        result = {name: stats.to_dict(self.prompt_price, self.completion_price) for name, stats in stages.items()}
+        total = {
+            key: sum(stage[key] for stage in result.values())
+            for key in ('calls', 'errors', 'retries', 'hedged', 'prompt_tokens', 'completion_tokens')
+        }
+        total['latency_total'] = round(sum(stage['latency_total'] for stage in result.values()), 3)
+        total['cost'] = round(sum(stage['cost'] for stage in result.values()), 6)
+        return {'stages': result, 'total': total}
+
+    def run_snapshot(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Показатели одного прогона"""
+        return {key: value for key, value in record.items() if key != 'stages'} | self._stages_dict(record['stages'])
+
+    def snapshot(self, limit: Optional[int] = None, kind: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Показатели за все время и по последним прогонам
+
+        Args:
+            limit: Количество последних прогонов
+            kind: Только прогоны заданного типа
+
+        Returns:
+            Словарь показателей
+        """
+        runs: List[Dict[str, Any]] = [record for record in self.runs if kind is None or record['kind'] == kind]
+        if limit is not None:
+            runs = runs[-limit:] if limit > 0 else []
+        return {
+            'totals': self._stages_dict(self.totals),
+            'runs': [self.run_snapshot(record) for record in reversed(runs)],
+        }
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Показатели прогона по идентификатору"""
+        for record in self.runs:
+            if record['id'] == run_id:
+                return self.run_snapshot(record)
+        return None
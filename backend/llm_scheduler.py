@@ -0,0 +1,359 @@
+"""
+Планировщик запросов к LLM с ограничением параллельности и лимитами запросов/токенов в минуту
+"""
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, TypeVar
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Ошибки, после которых запрос имеет смысл повторить
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError, asyncio.TimeoutError)
+
+# Крайний срок (time.monotonic) для запросов текущего обновления, наследуется задачами asyncio
+_deadline: ContextVar[Optional[float]] = ContextVar('llm_deadline', default=None)
+
+
+class LLMDeadlineExceeded(Exception):
+    """Крайний срок обновления истек до завершения запроса к LLM"""
+
+
+@contextlib.contextmanager
+def llm_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Ограничение общего времени запросов к LLM внутри блока
+
+    Запросы, начатые внутри блока (в том числе в задачах asyncio.gather),
+    не ждут ответа и не повторяются дольше крайнего срока.
+
+    Args:
+        seconds: Длительность в секундах (0 или None - без ограничения)
+    """
+    if not seconds:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def deadline_remaining() -> Optional[float]:
+    """Оставшееся до крайнего срока время в секундах (None - без ограничения)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class TokenBucket:
+    """Token bucket с пополнением rate_per_minute единиц в минуту"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Инициализация корзины
+
+        Args:
+            rate_per_minute: Скорость пополнения в единицах в минуту
+            capacity: Емкость корзины (по умолчанию равна минутному лимиту)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        """Пополнение корзины за прошедшее время"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float):
+        """
+        Ожидание, пока в корзине накопится amount единиц, и их списание
+
+        Args:
+            amount: Количество единиц (запрос больше емкости ограничивается емкостью)
+        """
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta: float):
+        """
+        Коррекция списания после получения фактического расхода
+
+        Args:
+            delta: Фактический расход минус оценка (может быть отрицательным)
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Пауза из заголовков retry-after / retry-after-ms ответа с ошибкой
+
+    Args:
+        error: Исключение OpenAI SDK
+
+    Returns:
+        Пауза в секундах или None
+    """
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+
+class LLMScheduler:
+    """Ограничивает одновременные запросы к LLM и темп расхода квоты, повторяет запросы после 429"""
+
+    def __init__(self, max_in_flight: int = 4, requests_per_minute: float = 0,
+                 tokens_per_minute: float = 0, max_retries: int = 5, base_backoff: float = 1.0,
+                 max_backoff: float = 30.0, request_timeout: float = 0, hedge_percentile: float = 0,
+                 hedge_min_samples: int = 20):
+        """
+        Инициализация планировщика
+
+        Args:
+            max_in_flight: Максимальное количество одновременных запросов
+            requests_per_minute: Лимит запросов в минуту (0 - без ограничения)
+            tokens_per_minute: Лимит токенов в минуту (0 - без ограничения)
+            max_retries: Максимальное количество повторов одного запроса
+            base_backoff: Пауза перед первым повтором, если сервер не указал retry-after
+            max_backoff: Максимальная пауза между повторами
+            request_timeout: Таймаут одной попытки запроса в секундах (0 - без таймаута)
+            hedge_percentile: Перцентиль задержки, после которого отправляется дублирующий
+                запрос (0 - без дублирования)
+            hedge_min_samples: Минимальное количество замеров задержки для дублирования
+        """
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.request_timeout = request_timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        # Задержки успешных запросов, для которых разрешено дублирование
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self._random = random.Random()
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        # Общая пауза после 429, чтобы остальные запросы не усугубляли превышение лимита
+        self._paused_until = 0.0
+
+    async def _wait_pause(self):
+        """Ожидание окончания общей паузы после превышения лимита"""
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _within_deadline(self, awaitable: Awaitable[Any]):
+        """
+        Ожидание лимита или паузы не дольше крайнего срока обновления
+
+        Raises:
+            LLMDeadlineExceeded: Если крайний срок истек раньше
+        """
+        remaining = deadline_remaining()
+        if remaining is None:
+            return await awaitable
+        if remaining <= 0:
+            awaitable.close()
+            raise LLMDeadlineExceeded("Истек крайний срок обновления")
+        try:
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError:
+            raise LLMDeadlineExceeded("Крайний срок обновления истек в ожидании лимита запросов") from None
+
+    async def run(self, call: Callable[[], Awaitable[T]], estimated_tokens: int = 0, hedge: bool = False,
+                  stats: Optional[Dict[str, Any]] = None) -> T:
+        """
+        Выполнение запроса к LLM с учетом лимитов
+
+        Args:
+            call: Фабрика корутины запроса (вызывается заново при каждом повторе)
+            estimated_tokens: Оценка токенов запроса (промпт + ответ)
+            hedge: Разрешить дублирующий запрос, если ответ задерживается дольше обычного
+            stats: Словарь, в который записываются количество повторов (retries), признак
+                отправки дублирующего запроса (hedged) и длительность самого успешного запроса
+                без ожидания лимитов, очереди и пауз между повторами (request_latency)
+
+        Returns:
+            Ответ LLM
+
+        Raises:
+            openai.OpenAIError: Если запрос не удался после всех повторов
+            asyncio.TimeoutError: Если истек таймаут последней попытки
+            LLMDeadlineExceeded: Если истек крайний срок обновления
+        """
+        attempt = 0
+        if stats is None:
+            stats = {}
+        stats.update(retries=0, hedged=False, request_latency=0.0)
+        while True:
+            await self._within_deadline(self._wait_pause())
+            if self._requests:
+                await self._within_deadline(self._requests.acquire(1))
+            if self._tokens and estimated_tokens:
+                await self._within_deadline(self._tokens.acquire(estimated_tokens))
+
+            timeout = self._attempt_timeout()
+            try:
+                if hedge:
+                    response = await self._call_hedged(call, timeout, stats, estimated_tokens)
+                    # Для порога дублирования важна задержка самого запроса, без очереди и лимитов
+                    self._latencies.append(stats['request_latency'])
+                else:
+                    response = await self._call_once(call, timeout, stats)
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = retry_after_seconds(e) or self._backoff(attempt)
+                remaining = deadline_remaining()
+                if remaining is not None and delay >= remaining:
+                    raise
+                if isinstance(e, openai.RateLimitError):
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                stats['retries'] = attempt
+                logger.warning(f"{type(e).__name__}, повтор {attempt}/{self.max_retries} через {delay:.1f} сек")
+                await asyncio.sleep(delay)
+                continue
+
+            self._record_usage(response, estimated_tokens)
+            return response
+
+    def _attempt_timeout(self) -> Optional[float]:
+        """Таймаут очередной попытки с учетом крайнего срока обновления"""
+        remaining = deadline_remaining()
+        if remaining is not None and remaining <= 0:
+            raise LLMDeadlineExceeded("Истек крайний срок обновления")
+        timeout = self.request_timeout or None
+        if remaining is not None:
+            timeout = min(timeout, remaining) if timeout else remaining
+        return timeout
+
+    def _backoff(self, attempt: int) -> float:
+        """Экспоненциальная пауза перед повтором со случайным разбросом (full jitter)"""
+        return self._random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** (attempt - 1))))
+
+    async def _call_once(self, call: Callable[[], Awaitable[T]], timeout: Optional[float],
+                         stats: Optional[Dict[str, Any]] = None, started: Optional[asyncio.Event] = None) -> T:
+        """
+        Одна попытка запроса в пределах ограничения параллельности
+
+        Длительность запроса (без ожидания свободного слота) пишется в stats,
+        событие started отмечает момент отправки запроса.
+        """
+        async with self._semaphore:
+            if started is not None:
+                started.set()
+            start_time = time.monotonic()
+            response = await asyncio.wait_for(call(), timeout)
+            if stats is not None:
+                stats['request_latency'] = time.monotonic() - start_time
+            return response
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Задержка, после которой отправляется дублирующий запрос (None - без дублирования)"""
+        if not self.hedge_percentile or len(self._latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        rank = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[rank]
+
+    async def _call_hedged(self, call: Callable[[], Awaitable[T]], timeout: Optional[float],
+                           stats: Dict[str, Any], estimated_tokens: int = 0) -> T:
+        """
+        Попытка запроса с дублированием при задержке ответа
+
+        Если ответ не пришел за перцентиль обычной задержки, отправляется
+        такой же запрос; используется первый успешный ответ, второй отменяется.
+        Задержка отсчитывается с момента отправки запроса: ожидание свободного
+        слота не приводит к дублированию. Дублирующий запрос расходует лимиты
+        запросов и токенов так же, как основной, а в stats попадает длительность
+        запроса, ответ которого использован.
+        """
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None or (timeout is not None and hedge_delay >= timeout):
+            return await self._call_once(call, timeout, stats)
+
+        started = asyncio.Event()
+        # У каждой попытки свой замер длительности, в stats переносится замер победителя
+        primary_stats: Dict[str, Any] = {}
+        hedge_stats: Dict[str, Any] = {}
+        primary = asyncio.ensure_future(self._call_once(call, timeout, primary_stats, started))
+        tasks = {primary}
+        try:
+            sent = asyncio.ensure_future(started.wait())
+            try:
+                await asyncio.wait({primary, sent}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                sent.cancel()
+
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done:
+                response = primary.result()
+                stats.update(primary_stats)
+                return response
+
+            self.hedged_requests += 1
+            stats['hedged'] = True
+            logger.info(f"Ответ LLM задерживается дольше {hedge_delay:.1f} сек, отправляем дублирующий запрос")
+            if self._requests:
+                await self._within_deadline(self._requests.acquire(1))
+            if self._tokens and estimated_tokens:
+                await self._within_deadline(self._tokens.acquire(estimated_tokens))
+            remaining_timeout = None if timeout is None else max(0.0, timeout - hedge_delay)
+            hedge = asyncio.ensure_future(self._call_once(call, remaining_timeout, hedge_stats))
+            tasks.add(hedge)
+
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        stats.update(hedge_stats if task is hedge else primary_stats)
+                        return task.result()
+                    if error is None or task is primary:
+                        error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _record_usage(self, response: Any, estimated_tokens: int):
+        """Коррекция лимита токенов по фактическому расходу из response.usage"""
+        usage = getattr(response, 'usage', None)
+        if self._tokens and usage is not None and getattr(usage, 'total_tokens', None):
+            self._tokens.adjust(usage.total_tokens - estimated_tokens)
@@ -0,0 +1,118 @@
+"""
+Локальная экстрактивная суммаризация новостей без обращения к сети
+"""
+import math
+import re
+from typing import Dict, Any, List, Set
+
+from compaction import strip_markup
+
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?…])\s+(?=[^\W\d_]|["«(])')
+WORD_RE = re.compile(r'[^\W\d_]{3,}')
+
+# Частые слова, не влияющие на сходство предложений
+STOP_WORDS = frozenset("""
+the and for that with this from are was were has have had not but its their they them his her you your
+will would can could said says into about after over more than also which who what when where while been
+это как что для его она они был была было были того этого также при после или уже еще над под где когда
+который которая которые чтобы если так все всех свой своих может будет есть нет только
+""".split())
+
+
+def split_sentences(text: str) -> List[str]:
+    """Разбиение текста на предложения (повторяющиеся предложения отбрасываются)"""
+    return list(dict.fromkeys(sentence.strip() for sentence in SENTENCE_SPLIT_RE.split(text) if sentence.strip()))
+
+
+def sentence_words(sentence: str) -> Set[str]:
+    """Значимые слова предложения в нижнем регистре"""
+    return {word for word in WORD_RE.findall(sentence.lower()) if word not in STOP_WORDS}
+
+
+class TextRankSummarizer:
+    """Экстрактивное резюме: предложения описания ранжируются TextRank по пересечению слов"""
+
+    def __init__(self, max_sentences: int = 2, max_chars: int = 400,
+                 damping: float = 0.85, iterations: int = 30):
+        """
+        Инициализация
+
+        Args:
+            max_sentences: Максимальное количество предложений в резюме
+            max_chars: Максимальная длина резюме в символах
+            damping: Коэффициент затухания PageRank
+            iterations: Количество итераций PageRank
+        """
+        self.max_sentences = max_sentences
+        self.max_chars = max_chars
+        self.damping = damping
+        self.iterations = iterations
+
+    def _rank(self, words: List[Set[str]], title_words: Set[str]) -> List[float]:
+        """
+        Веса предложений по TextRank
+
+        Сходство предложений - число общих слов, нормированное на логарифмы длин.
+        Предложения, пересекающиеся с заголовком, получают больший начальный вес.
+        """
+        count = len(words)
+        weights = [[0.0] * count for _ in range(count)]
+        for i in range(count):
+            for j in range(i + 1, count):
+                common = len(words[i] & words[j])
+                if common and len(words[i]) > 1 and len(words[j]) > 1:
+                    similarity = common / (math.log(len(words[i])) + math.log(len(words[j])))
+                    weights[i][j] = weights[j][i] = similarity
+        totals = [sum(row) for row in weights]
+
+        bias = [1.0 + len(sentence & title_words) for sentence in words]
+        bias_total = sum(bias)
+        bias = [value / bias_total for value in bias]
+
+        scores = bias[:]
+        for _ in range(self.iterations):
+            scores = [
+                (1 - self.damping) * bias[i] + self.damping * sum(
+                    weights[j][i] / totals[j] * scores[j] for j in range(count) if weights[j][i]
+                )
+                for i in range(count)
+            ]
+        return scores
+
+    def summarize(self, news_item: Dict[str, Any]) -> str:
+        """
+        Экстрактивное резюме новости
+
+        Args:
+            news_item: Словарь с данными новости
+
+        Returns:
+            Резюме из наиболее значимых предложений описания в исходном порядке
+            (заголовок, если описание пустое)
+        """
+        title = news_item.get('title', '')
+        description = strip_markup(news_item.get('description', '') or '')
+        sentences = split_sentences(description)
+        if not sentences:
+            return title
+
+        if len(sentences) > self.max_sentences:
+            scores = self._rank([sentence_words(s) for s in sentences], sentence_words(title))
+            # При равных весах предпочтение более ранним предложениям
+            top = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))[:self.max_sentences]
+            sentences = [sentences[i] for i in sorted(top)]
+
+        summary = ' '.join(sentences)
+        if len(summary) > self.max_chars:
+            summary = summary[:self.max_chars].rsplit(' ', 1)[0] + '…'
+        return summary
+
+    def summarize_many(self, news_list: List[Dict[str, Any]]) -> List[str]:
+        """Резюме списка новостей"""
+        return [self.summarize(news) for news in news_list]
+
+
+# Доступные локальные реализации суммаризации по имени из config.yaml
+LOCAL_BACKENDS = {
+    'textrank': TextRankSummarizer,
+}
@@ -1,13 +1,12 @@
 """
 Главный модуль новостного агрегатора
 """
-import yaml
+import asyncio
 import json
 from pathlib import Path
 import logging
-from typing import Dict, Any
-from rss_parser import RSSParser
-from summarizer import NewsSummarizer
+from llm_metrics import format_total
+from pipeline import NewsPipeline
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,64 +23,44 @@ class NewsAggregator:
         Args:
             config_path: Путь к файлу конфигурации
         """
-        self.config = self._load_config(config_path)
-        self.parser = RSSParser(
-            max_news_per_source=self.config['news']['max_news_per_source']
-        )
-        self.summarizer = NewsSummarizer(self.config['api'])
-    
-    def _load_config(self, config_path: str) -> Dict[str, Any]:
-        """
-        Загрузка конфигурации из YAML файла
-        
-        Args:
-            config_path: Путь к файлу конфигурации
-            
-        Returns:
-            Словарь с конфигурацией
-        """
-        logger.info(f"Загрузка конфигурации из {config_path}")
-        
-        config_file = Path(config_path)
-        if not config_file.exists():
-            raise FileNotFoundError(f"Конфигурационный файл не найден: {config_path}")
-        
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        
+        self.pipeline = NewsPipeline.from_file(config_path)
+        self.config = self.pipeline.config
         logger.info("Конфигурация успешно загружена")
-        return config
     
-    def run(self):
+    async def run(self):
         """Основной метод запуска агрегатора"""
+        try:
+            await self._run()
+        finally:
+            await self.pipeline.close()
+    
+    async def _run(self):
+        """Шаги обработки новостей"""
         logger.info("=" * 80)
         logger.info("TU TU RU RU max verstappen TU TU RU RU")
         logger.info("=" * 80)
         
         # Шаг 1: Парсинг RSS источников
         logger.info("\n[ШАГ 1] Парсинг RSS источников...")
-        news_by_category = self.parser.parse_all_sources(
-            self.config['rss_sources']
-        )
-        
-        # Получаем плоский список всех новостей
-        all_news = self.parser.get_all_news_flat(news_by_category)
+        news_by_category, all_news = await self.pipeline.collect()
         logger.info(f"Всего собрано новостей: {len(all_news)}")
         
         if not all_news:
             logger.warning("Новости не найдены! Завершение работы.")
             return
         
-        # Шаг 2: Суммаризация новостей
-        logger.info("\n[ШАГ 2] Суммаризация новостей...")
-        summarized_news = self.summarizer.summarize_all_news(all_news)
+        with self.pipeline.llm_scope('cli') as llm_run:
+            # Шаг 2: Суммаризация новостей
+            logger.info("\n[ШАГ 2] Суммаризация новостей...")
+            summarized_news = await self.pipeline.summarize_new(all_news)
+            
+            # Шаг 3: Выбор топ-новостей дня
+            logger.info("\n[ШАГ 3] Выбор топ-новостей дня...")
+            top_news = await self.pipeline.select_top(summarized_news)
         
-        # Шаг 3: Выбор топ-новостей дня
-        logger.info("\n[ШАГ 3] Выбор топ-новостей дня...")
-        top_news = self.summarizer.select_top_news(
-            summarized_news,
-            top_count=self.config['news']['top_news_count']
-        )
+        llm_stats = self.pipeline.metrics.run_snapshot(llm_run)
+        for stage, stats in llm_stats['stages'].items():
+            logger.info(f"LLM [{stage}]: {format_total(stats)}, p95 {stats['latency_p95']:.2f} сек")
         
         # Шаг 4: Вывод результатов
         logger.info("\n[ШАГ 4] Формирование отчета...")
@@ -89,6 +68,7 @@ class NewsAggregator:
         
         # Сохранение результатов в JSON
         self._save_results(news_by_category, summarized_news, top_news)
+        self.pipeline.parser.save_feed_cache()
         
         logger.info("\n" + "=" * 80)
         logger.info("РАБОТА АГРЕГАТОРА ЗАВЕРШЕНА")
@@ -184,7 +164,7 @@ def main():
     """Точка входа в приложение"""
     try:
         aggregator = NewsAggregator(config_path='config.yaml')
-        aggregator.run()
+        asyncio.run(aggregator.run())
     except Exception as e:
         logger.error(f"Критическая ошибка: {e}", exc_info=True)
         raise
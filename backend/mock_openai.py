@@ -0,0 +1,458 @@
+"""
+Локальный OpenAI-совместимый сервер для нагрузочных тестов суммаризации без расхода токенов
+
+Отвечает на /v1/chat/completions в форматах, которые разбирает NewsSummarizer
+(нумерованные списки ЗАГОЛОВКИ/РЕЗЮМЕ, JSON по схеме, номера топ-новостей),
+с настраиваемым распределением задержек и долей ошибок 5xx и 429.
+Эндпоинты /v1/files и /v1/batches выполняют пакетные задания (bulk_summarize.py).
+
+Запуск:
+    python mock_openai.py --port 8001 --latency 0.5 --distribution lognormal --rate-limit-rate 0.05
+и в config.yaml: api.openai.base_url: "http://127.0.0.1:8001/v1"
+"""
+import argparse
+import asyncio
+import email.parser
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from starlette.requests import ClientDisconnect
+
+from compaction import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+RESPONSE_MODES = ('canned', 'echo')
+
+BATCH_ITEM_RE = re.compile(r'НОВОСТЬ (\d+):\nЗаголовок: (.*)')
+TOP_SELECTION_RE = re.compile(r'следующие (\d+) новостей и выбери (\d+)')
+
+
+class MockLLM:
+    """Генератор ответов chat completions с искусственными задержками и ошибками"""
+
+    def __init__(self, latency: float = 0.0, distribution: str = 'fixed', sigma: float = 0.5,
+                 per_item_latency: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after: float = 1.0, mode: str = 'canned', seed: Optional[int] = None):
+        """
+        Инициализация
+
+        Args:
+            latency: Базовая задержка ответа в секундах (медиана для lognormal, среднее для exponential)
+            distribution: Распределение задержки (fixed, uniform, exponential, lognormal)
+            sigma: Разброс lognormal распределения
+            per_item_latency: Добавка к задержке за каждую новость или текст в запросе
+            error_rate: Доля ответов 500
+            rate_limit_rate: Доля ответов 429
+            retry_after: Значение заголовка Retry-After для 429 в секундах
+            mode: canned - готовые тексты на русском, echo - исходные тексты из запроса
+            seed: Зерно генератора (для воспроизводимых замеров)
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Неизвестное распределение задержки: {distribution}")
+        if mode not in RESPONSE_MODES:
+            raise ValueError(f"Неизвестный режим ответов: {mode}")
+        self.latency = latency
+        self.distribution = distribution
+        self.sigma = sigma
+        self.per_item_latency = per_item_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.mode = mode
+        self._random = random.Random(seed)
+        self.requests: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def sample_latency(self, items: int = 0) -> float:
+        """Задержка ответа по заданному распределению"""
+        if self.distribution == 'uniform':
+            delay = self._random.uniform(0, 2 * self.latency)
+        elif self.distribution == 'exponential':
+            delay = self._random.expovariate(1 / self.latency) if self.latency > 0 else 0.0
+        elif self.distribution == 'lognormal':
+            delay = self.latency * self._random.lognormvariate(0, self.sigma)
+        else:
+            delay = self.latency
+        return delay + self.per_item_latency * items
+
+    def _title(self, number: int, original: str) -> str:
+        """Заголовок или перевод текста в ответе"""
+        return original if self.mode == 'echo' else f"Заголовок новости номер {number}"
+
+    def _summary(self, number: int, original: str) -> str:
+        """Резюме новости в ответе"""
+        if self.mode == 'echo':
+            return original
+        # Без слов ЗАГОЛОВКИ/РЕЗЮМЕ: в текстовом формате они считаются заголовками секций
+        return (f"Краткое содержание новости номер {number}. "
+                f"Второе предложение с ключевыми фактами и последствиями.")
+
+    def complete(self, body: Dict[str, Any]) -> Tuple[str, str, int]:
+        """
+        Ответ на запрос chat completions
+
+        Args:
+            body: Тело запроса
+
+        Returns:
+            Кортеж (тип запроса, текст ответа, количество новостей или текстов в запросе)
+        """
+        messages = body.get('messages') or [{}]
+        prompt = messages[-1].get('content') or ''
+        response_format = body.get('response_format') or {}
+        schema_name = (response_format.get('json_schema') or {}).get('name')
+
+        entries = self._prompt_entries(prompt)
+        if schema_name == 'news_summaries' or (entries and 'title' in entries[0]):
+            items = [
+                {'id': entry.get('id', ''), 'title': self._title(i + 1, entry.get('title', '')),
+                 'summary': self._summary(i + 1, entry.get('content', entry.get('title', '')))}
+                for i, entry in enumerate(entries)
+            ]
+            return 'summary_batch', json.dumps({'items': items}, ensure_ascii=False), len(entries)
+
+        if schema_name == 'translations' or (entries and 'text' in entries[0]):
+            items = [
+                {'id': entry.get('id', ''), 'text': self._title(i + 1, entry.get('text', ''))}
+                for i, entry in enumerate(entries)
+            ]
+            return 'batch_translation', json.dumps({'items': items}, ensure_ascii=False), len(entries)
+
+        batch_titles = BATCH_ITEM_RE.findall(prompt)
+        if batch_titles:
+            titles = [f"{number}. {self._title(int(number), title)}" for number, title in batch_titles]
+            summaries = [f"{number}. {self._summary(int(number), title)}" for number, title in batch_titles]
+            content = 'ЗАГОЛОВКИ:\n' + '\n'.join(titles) + '\n\nРЕЗЮМЕ:\n' + '\n'.join(summaries)
+            return 'summary_batch', content, len(batch_titles)
+
+        top_match = TOP_SELECTION_RE.search(prompt)
+        if top_match:
+            candidates, count = int(top_match.group(1)), int(top_match.group(2))
+            numbers = sorted(self._random.sample(range(1, candidates + 1), min(count, candidates)))
+            return 'top_selection', ', '.join(str(n) for n in numbers), candidates
+
+        if self.mode == 'echo':
+            return 'other', prompt, 1
+        return 'other', "Перевод текста на русский язык", 1
+
+    @staticmethod
+    def _prompt_entries(prompt: str) -> List[Dict[str, Any]]:
+        """Список новостей или текстов, переданный в промпте в формате JSON"""
+        for block in prompt.split('\n\n'):
+            block = block.strip()
+            if not block.startswith('['):
+                continue
+            try:
+                entries = json.loads(block)
+            except ValueError:
+                continue
+            if isinstance(entries, list) and entries and isinstance(entries[0], dict):
+                return entries
+        return []
+
+    def build_response(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str], float]:
+        """
+        Ответ сервера: статус, тело, заголовки и задержка перед отправкой
+
+        Args:
+            body: Тело запроса
+
+        Returns:
+            Кортеж (HTTP статус, тело ответа, заголовки, задержка в секундах)
+        """
+        kind, content, items = self.complete(body)
+        self.requests[kind] += 1
+        delay = self.sample_latency(items)
+
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            self.statuses[429] += 1
+            error = {'error': {'message': 'Rate limit reached (mock)', 'type': 'rate_limit_error',
+                               'param': None, 'code': 'rate_limit_exceeded'}}
+            # Отказ по лимиту приходит без задержки генерации
+            return 429, error, {'Retry-After': str(self.retry_after)}, 0.0
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.statuses[500] += 1
+            error = {'error': {'message': 'Internal server error (mock)', 'type': 'server_error',
+                               'param': None, 'code': None}}
+            return 500, error, {}, delay
+
+        prompt_tokens = sum(estimate_tokens(m.get('content') or '') for m in body.get('messages', []))
+        completion_tokens = estimate_tokens(content)
+        finish_reason = 'stop'
+        max_tokens = body.get('max_completion_tokens') or body.get('max_tokens')
+        if max_tokens and completion_tokens > max_tokens:
+            finish_reason = 'length'
+        self.statuses[200] += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        return 200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'mock'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': finish_reason
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        }, {}, delay
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики запросов по типам и статусам ответов"""
+        return {
+            'requests': dict(self.requests),
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens
+        }
+
+
+def parse_multipart(content_type: str, body: bytes) -> Dict[str, Tuple[Optional[str], bytes]]:
+    """
+    Разбор multipart/form-data без python-multipart
+
+    Args:
+        content_type: Заголовок Content-Type запроса
+        body: Тело запроса
+
+    Returns:
+        Поля формы: имя -> (имя файла, содержимое)
+    """
+    message = email.parser.BytesParser().parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('utf-8') + body
+    )
+    fields = {}
+    for part in message.get_payload() if message.is_multipart() else []:
+        name = part.get_param('name', header='content-disposition')
+        if name:
+            fields[name] = (part.get_filename(), part.get_payload(decode=True) or b'')
+    return fields
+
+
+class MockBatchJobs:
+    """Файлы и пакетные задания Batch API поверх MockLLM"""
+
+    def __init__(self, mock: MockLLM, batch_delay: float = 1.0):
+        """
+        Инициализация
+
+        Args:
+            mock: Генератор ответов на отдельные запросы задания
+            batch_delay: Время выполнения задания в секундах
+        """
+        self.mock = mock
+        self.batch_delay = batch_delay
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.contents: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._tasks: set = set()
+
+    def add_file(self, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        """Сохранение файла, возвращает описание в формате Files API"""
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self.files[file_id] = {
+            'id': file_id,
+            'object': 'file',
+            'bytes': len(content),
+            'created_at': int(time.time()),
+            'filename': filename,
+            'purpose': purpose,
+            'status': 'processed'
+        }
+        self.contents[file_id] = content
+        return self.files[file_id]
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str,
+                     metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Создание задания и запуск его выполнения в фоне"""
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        self.batches[batch_id] = {
+            'id': batch_id,
+            'object': 'batch',
+            'endpoint': endpoint,
+            'input_file_id': input_file_id,
+            'completion_window': completion_window,
+            'status': 'validating',
+            'created_at': int(time.time()),
+            'output_file_id': None,
+            'error_file_id': None,
+            'metadata': metadata,
+            'request_counts': {'total': 0, 'completed': 0, 'failed': 0}
+        }
+        task = asyncio.ensure_future(self._process(batch_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return self.batches[batch_id]
+
+    async def _process(self, batch_id: str):
+        """Выполнение запросов задания и запись файлов результатов и ошибок"""
+        batch = self.batches[batch_id]
+        lines = [line for line in self.contents.get(batch['input_file_id'], b'').decode('utf-8').splitlines() if line]
+        batch['request_counts']['total'] = len(lines)
+        batch['status'] = 'in_progress'
+        batch['in_progress_at'] = int(time.time())
+        await asyncio.sleep(self.batch_delay)
+
+        output, errors = [], []
+        for line in lines:
+            request = json.loads(line)
+            status, payload, _, _ = self.mock.build_response(request.get('body') or {})
+            record = {
+                'id': f"batch_req_{uuid.uuid4().hex[:24]}",
+                'custom_id': request.get('custom_id'),
+                'response': {'status_code': status, 'request_id': uuid.uuid4().hex, 'body': payload},
+                'error': None
+            }
+            if status == 200:
+                output.append(record)
+                batch['request_counts']['completed'] += 1
+            else:
+                errors.append(record)
+                batch['request_counts']['failed'] += 1
+
+        for key, records in (('output_file_id', output), ('error_file_id', errors)):
+            if records:
+                content = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+                batch[key] = self.add_file(content.encode('utf-8'), f"{batch_id}_{key}.jsonl", 'batch_output')['id']
+        batch['status'] = 'completed'
+        batch['completed_at'] = int(time.time())
+
+
+def create_app(mock: MockLLM, jobs: Optional[MockBatchJobs] = None) -> FastAPI:
+    """
+    FastAPI приложение OpenAI-совместимого сервера
+
+    Args:
+        mock: Генератор ответов
+        jobs: Файлы и пакетные задания (по умолчанию создаются поверх mock)
+
+    Returns:
+        Приложение
+    """
+    app = FastAPI(title="Mock OpenAI API")
+    jobs = jobs or MockBatchJobs(mock)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            # Клиент отменил запрос (например, проигравший дублирующий запрос)
+            return Response(status_code=499)
+        status, payload, headers, delay = mock.build_response(body)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return JSONResponse(payload, status_code=status, headers=headers)
+
+    @app.post("/v1/files")
+    async def upload_file(request: Request):
+        fields = parse_multipart(request.headers.get('content-type', ''), await request.body())
+        filename, content = fields.get('file', (None, b''))
+        purpose = fields.get('purpose', (None, b''))[1].decode('utf-8')
+        return jobs.add_file(content, filename or 'upload.jsonl', purpose)
+
+    @app.get("/v1/files/{file_id}")
+    async def get_file(file_id: str):
+        if file_id not in jobs.files:
+            return JSONResponse({'error': {'message': f"No such file: {file_id}"}}, status_code=404)
+        return jobs.files[file_id]
+
+    @app.get("/v1/files/{file_id}/content")
+    async def get_file_content(file_id: str):
+        if file_id not in jobs.contents:
+            return JSONResponse({'error': {'message': f"No such file: {file_id}"}}, status_code=404)
+        return Response(jobs.contents[file_id], media_type='application/jsonl')
+
+    @app.post("/v1/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        if body.get('input_file_id') not in jobs.files:
+            return JSONResponse({'error': {'message': "Unknown input_file_id"}}, status_code=400)
+        return jobs.create_batch(body['input_file_id'], body.get('endpoint', '/v1/chat/completions'),
+                                 body.get('completion_window', '24h'), body.get('metadata'))
+
+    @app.get("/v1/batches/{batch_id}")
+    async def get_batch(batch_id: str):
+        if batch_id not in jobs.batches:
+            return JSONResponse({'error': {'message': f"No such batch: {batch_id}"}}, status_code=404)
+        return jobs.batches[batch_id]
+
+    @app.get("/v1/models")
+    async def models():
+        return {'object': 'list', 'data': [{'id': 'mock', 'object': 'model', 'owned_by': 'mock'}]}
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return mock.stats()
+
+    return app
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Аргументы командной строки настроек MockLLM (общие для сервера и бенчмарка)"""
+    parser.add_argument('--latency', type=float, default=0.05, help="Базовая задержка ответа (сек)")
+    parser.add_argument('--distribution', choices=LATENCY_DISTRIBUTIONS, default='lognormal',
+                        help="Распределение задержки")
+    parser.add_argument('--sigma', type=float, default=0.5, help="Разброс lognormal распределения")
+    parser.add_argument('--per-item-latency', type=float, default=0.0,
+                        help="Добавка к задержке за каждую новость в запросе (сек)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Доля ответов 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After для 429 (сек)")
+    parser.add_argument('--mode', choices=RESPONSE_MODES, default='canned', help="Тексты ответов")
+    parser.add_argument('--seed', type=int, default=42, help="Зерно случайных задержек и ошибок")
+    parser.add_argument('--batch-delay', type=float, default=1.0, help="Время выполнения пакетного задания (сек)")
+
+
+def mock_from_args(args: argparse.Namespace) -> MockLLM:
+    """MockLLM по аргументам командной строки"""
+    return MockLLM(
+        latency=args.latency,
+        distribution=args.distribution,
+        sigma=args.sigma,
+        per_item_latency=args.per_item_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        mode=args.mode,
+        seed=args.seed
+    )
+
+
+def main():
+    """Точка входа: запуск сервера"""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-совместимый сервер для нагрузочных тестов")
+    parser.add_argument('--host', default='127.0.0.1', help="Адрес")
+    parser.add_argument('--port', type=int, default=8001, help="Порт")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger.info(f"Mock OpenAI API: http://{args.host}:{args.port}/v1")
+    mock = mock_from_args(args)
+    app = create_app(mock, MockBatchJobs(mock, batch_delay=args.batch_delay))
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
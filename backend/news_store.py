@@ -0,0 +1,239 @@
+"""
+Персистентное хранилище уже обработанных новостей для инкрементального обновления
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Поля, заполняемые при сборе новостей в текущем обновлении (не берутся из хранилища)
+INGEST_FIELDS = ('category', 'alternate_sources', 'simhash', 'lang')
+
+# Источники резюме, не полученных от LLM: такие новости обрабатываются повторно
+UNSAVED_SOURCES = ('local', 'fallback', 'error')
+
+# Параметры ссылок, не влияющие на содержимое новости (имена сравниваются точно,
+# чтобы не отбрасывать значимые параметры вроде fromDate или refid)
+TRACKING_PARAMS = {'yclid', 'gclid', 'fbclid', 'from', 'ref'}
+TRACKING_PARAMS_PREFIXES = ('utm_',)
+
+
+def normalize_link(link: str) -> str:
+    """
+    Нормализация ссылки на новость (схема, регистр хоста, трекинговые параметры)
+
+    Args:
+        link: Ссылка на новость
+
+    Returns:
+        Нормализованная ссылка
+    """
+    if not link:
+        return ''
+
+    parts = urlsplit(link.strip())
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAMS_PREFIXES)
+    ]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', parts.netloc.lower(), path, urlencode(sorted(query)), ''))
+
+
+def make_news_id(guid: Optional[str], link: str) -> str:
+    """
+    Стабильный идентификатор новости по GUID или нормализованной ссылке
+
+    Args:
+        guid: GUID записи RSS ленты (может отсутствовать)
+        link: Ссылка на новость
+
+    Returns:
+        Идентификатор новости
+    """
+    key = guid.strip() if guid and guid.strip() else normalize_link(link)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def news_item_id(news_item: Dict[str, Any]) -> str:
+    """Идентификатор новости (для записей без поля id вычисляется по ссылке)"""
+    return news_item.get('id') or make_news_id(None, news_item.get('link', ''))
+
+
+class NewsStore:
+    """SQLite хранилище просмотренных и суммаризированных новостей"""
+
+    def __init__(self, path: str = 'output/news_store.db', max_age_days: int = 7):
+        """
+        Инициализация хранилища
+
+        Args:
+            path: Путь к файлу базы данных
+            max_age_days: Через сколько дней без появления в лентах новость удаляется
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age_days = max_age_days
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS seen_news (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            )"""
+        )
+        self.conn.commit()
+
+    def _load(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Загрузка сохраненных новостей по идентификаторам"""
+        stored = {}
+        chunk_size = 500
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT id, data FROM seen_news WHERE id IN ({placeholders})", chunk
+            )
+            for news_id, data in rows:
+                stored[news_id] = json.loads(data)
+        return stored
+
+    def load(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Сохраненные новости по идентификаторам
+
+        Args:
+            ids: Идентификаторы новостей
+
+        Returns:
+            Новости по идентификатору (только найденные)
+        """
+        return self._load(ids)
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        """Все сохраненные новости в порядке первого появления"""
+        rows = self.conn.execute("SELECT data FROM seen_news ORDER BY first_seen")
+        return [json.loads(data) for data, in rows]
+
+    def update(self, news_list: List[Dict[str, Any]]) -> int:
+        """
+        Замена данных уже сохраненных новостей (время появления в лентах не меняется)
+
+        Args:
+            news_list: Новости с обновленными полями
+
+        Returns:
+            Количество обновленных новостей
+        """
+        cursor = self.conn.executemany(
+            "UPDATE seen_news SET data = ? WHERE id = ?",
+            [(json.dumps(news, ensure_ascii=False), news_item_id(news)) for news in news_list]
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def split_new(self, news_list: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Разделение новостей на новые и уже обработанные
+
+        Args:
+            news_list: Список новостей из лент (не изменяются; id новостей без поля id
+                вычисляется по ссылке, см. news_item_id)
+
+        Returns:
+            Кортеж (новые новости, сохраненные версии уже обработанных новостей)
+        """
+        ids = [news_item_id(news) for news in news_list]
+        stored = self._load(ids)
+
+        new_news = []
+        known_news = []
+        for news_id, news in zip(ids, news_list):
+            if news_id in stored:
+                known_news.append(stored[news_id])
+            else:
+                new_news.append(news)
+
+        if known_news:
+            now = datetime.now().isoformat()
+            self.conn.executemany(
+                "UPDATE seen_news SET last_seen = ? WHERE id = ?",
+                [(now, news_item_id(news)) for news in known_news]
+            )
+            self.conn.commit()
+
+        logger.info(f"Новых новостей: {len(new_news)}, уже обработанных: {len(known_news)}")
+        return new_news, known_news
+
+    def save(self, news_list: List[Dict[str, Any]]):
+        """
+        Сохранение суммаризированных новостей
+
+        Новости без резюме и с резюме, полученным не от LLM (локальное, заглушка
+        из описания или текст ошибки), не сохраняются, чтобы они были обработаны
+        (или получили резюме от LLM) в следующий раз.
+
+        Args:
+            news_list: Список суммаризированных новостей
+        """
+        now = datetime.now().isoformat()
+        rows = [
+            (news_item_id(news), json.dumps(news, ensure_ascii=False), now, now)
+            for news in news_list if news.get('summary') and news.get('summary_source') not in UNSAVED_SOURCES
+        ]
+        self.conn.executemany(
+            """INSERT INTO seen_news (id, data, first_seen, last_seen) VALUES (?, ?, ?, ?)
+               ON CONFLICT(id) DO UPDATE SET data = excluded.data, last_seen = excluded.last_seen""",
+            rows
+        )
+        self.conn.commit()
+        logger.info(f"Сохранено {len(rows)} новостей в хранилище")
+
+    def merge(self, news_list: List[Dict[str, Any]], summarized_news: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Сборка итогового списка новостей в порядке лент
+
+        Для каждой новости берется свежая суммаризация, иначе сохраненная версия,
+        иначе исходная новость. Поля INGEST_FIELDS всегда берутся из текущего обновления.
+
+        Args:
+            news_list: Все новости из лент
+            summarized_news: Новости, суммаризированные в текущем обновлении
+
+        Returns:
+            Итоговый список новостей
+        """
+        fresh = {news_item_id(news): news for news in summarized_news}
+        ids = [news_item_id(news) for news in news_list]
+        stored = self._load([news_id for news_id in ids if news_id not in fresh])
+
+        result = []
+        for news_id, news in zip(ids, news_list):
+            merged = fresh.get(news_id) or stored.get(news_id) or news
+            for field in INGEST_FIELDS:
+                if field in news:
+                    merged[field] = news[field]
+                else:
+                    merged.pop(field, None)
+            result.append(merged)
+        return result
+
+    def prune(self):
+        """Удаление новостей, давно не появлявшихся в лентах"""
+        cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+        cursor = self.conn.execute("DELETE FROM seen_news WHERE last_seen < ?", (cutoff,))
+        self.conn.commit()
+        if cursor.rowcount:
+            logger.info(f"Удалено {cursor.rowcount} устаревших новостей из хранилища")
+
+    def close(self):
+        """Закрытие соединения с базой данных"""
+        self.conn.close()
@@ -0,0 +1,206 @@
+"""
+Долгоживущий конвейер обработки новостей с общими клиентами и кэшами
+"""
+import contextlib
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+
+from dedup import deduplicate_news
+from llm_metrics import LLMMetrics, format_total
+from news_store import NewsStore, news_item_id
+from ranking import source_weights
+from rss_parser import RSSParser
+from source_health import SourceHealth
+from summarizer import NewsSummarizer
+
+logger = logging.getLogger(__name__)
+
+
+def load_config(config_path: str = 'config.yaml') -> Dict[str, Any]:
+    """
+    Загрузка конфигурации из YAML файла
+
+    Args:
+        config_path: Путь к файлу конфигурации
+
+    Returns:
+        Словарь с конфигурацией
+    """
+    config_file = Path(config_path)
+    if not config_file.exists():
+        raise FileNotFoundError(f"Конфигурационный файл не найден: {config_path}")
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+class NewsPipeline:
+    """
+    Сбор, суммаризация и выбор топ-новостей с ресурсами, живущими между обновлениями
+
+    Конфигурация читается один раз. HTTP клиент лент (с условными запросами и
+    состоянием источников), клиент LLM с пулом соединений, пул процессов
+    парсинга, хранилище, кэш суммаризаций и память переводов создаются при
+    запуске и переиспользуются всеми обновлениями и плановыми опросами.
+    Изменения config.yaml применяются после перезапуска.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Инициализация конвейера
+
+        Args:
+            config: Конфигурация из config.yaml
+        """
+        self.config = config
+        news_config = config['news']
+
+        breaker_config = news_config.get('circuit_breaker', {})
+        self.source_health = SourceHealth(
+            failure_threshold=breaker_config.get('failure_threshold', 3),
+            base_backoff=breaker_config.get('base_backoff', 60),
+            max_backoff=breaker_config.get('max_backoff', 3600)
+        )
+        self.parser = RSSParser(
+            max_news_per_source=news_config['max_news_per_source'],
+            fetch_config=news_config.get('fetch'),
+            feed_cache_path=news_config.get('feed_cache_path'),
+            parse_workers=news_config.get('parse_workers', 0),
+            streaming_parse=news_config.get('streaming_parse', False),
+            description_tokens=news_config.get('description_token_budget', 0),
+            source_health=self.source_health
+        )
+
+        pricing_config = config['api'].get('openai', {}).get('pricing', {})
+        self.metrics = LLMMetrics(
+            prompt_price=pricing_config.get('prompt_per_million', 0.0),
+            completion_price=pricing_config.get('completion_per_million', 0.0),
+            history=config['api'].get('metrics', {}).get('history', 20)
+        )
+        self.summarizer = NewsSummarizer(config['api'], metrics=self.metrics)
+
+        self.store = NewsStore(
+            news_config.get('store_path', 'output/news_store.db'),
+            max_age_days=news_config.get('store_max_age_days', 7)
+        )
+        self.source_weights = source_weights(config['rss_sources'])
+
+    @classmethod
+    def from_file(cls, config_path: str = 'config.yaml') -> 'NewsPipeline':
+        """Конвейер по файлу конфигурации"""
+        logger.info(f"Загрузка конфигурации из {config_path}")
+        return cls(load_config(config_path))
+
+    async def collect(self) -> Tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        """
+        Сбор новостей из всех лент со схлопыванием одинаковых новостей
+
+        Returns:
+            Кортеж (новости по категориям, плоский список новостей после дедупликации)
+        """
+        news_by_category = await self.parser.parse_all_sources_async(self.config['rss_sources'])
+        all_news = self.parser.get_all_news_flat(news_by_category)
+        return news_by_category, self.deduplicate(all_news)
+
+    def deduplicate(self, news_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Схлопывание одинаковых новостей из разных источников (если включено в конфигурации)"""
+        dedup_config = self.config['news'].get('dedup', {})
+        if not dedup_config.get('enabled', True):
+            return news_list
+        return deduplicate_news(news_list, max_distance=dedup_config.get('max_distance', 6))
+
+    @contextlib.contextmanager
+    def llm_scope(self, kind: str) -> Iterator[Dict[str, Any]]:
+        """
+        Прогон обработки: учет запросов к LLM и крайний срок обновления
+
+        Args:
+            kind: Тип прогона (refresh, poll, cli)
+
+        Yields:
+            Запись прогона в LLMMetrics
+        """
+        with self.metrics.run(kind) as run, self.summarizer.deadline_scope():
+            yield run
+        logger.info(f"Запросы к LLM ({kind}): {format_total(self.metrics.run_snapshot(run)['total'])}")
+
+    async def summarize_new(self, all_news: List[Dict[str, Any]],
+                            on_progress: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+                            ) -> List[Dict[str, Any]]:
+        """
+        Суммаризация только новых новостей, остальные берутся из хранилища
+
+        Args:
+            all_news: Новости из лент
+            on_progress: Вызывается с промежуточным списком новостей: сначала новые новости
+                без резюме (summary_pending), затем после каждого готового батча
+
+        Returns:
+            Итоговый список новостей в порядке лент
+        """
+        new_news, _ = self.store.split_new(all_news)
+
+        on_batch = None
+        if on_progress and new_news:
+            pending_ids = {news_item_id(news) for news in new_news}
+            current = [
+                {**news, 'summary_pending': True} if news_item_id(news) in pending_ids else news
+                for news in self.store.merge(all_news, [])
+            ]
+            positions = {news_item_id(news): i for i, news in enumerate(current) if news.get('summary_pending')}
+            on_progress(list(current))
+
+            def on_batch(batch: List[Dict[str, Any]]):
+                for news in batch:
+                    position = positions.get(news_item_id(news))
+                    if position is not None:
+                        current[position] = news
+                on_progress(list(current))
+
+        fresh_news = await self.summarizer.summarize_all_news(new_news, on_batch=on_batch) if new_news else []
+        self.store.save(fresh_news)
+        summarized_news = self.store.merge(all_news, fresh_news)
+        self.store.prune()
+        return summarized_news
+
+    async def select_top(self, news_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Выбор топ-новостей дня"""
+        return await self.summarizer.select_top_news(
+            news_list,
+            top_count=self.config['news']['top_news_count'],
+            source_weights=self.source_weights
+        )
+
+    async def process(self, all_news: List[Dict[str, Any]], kind: str = 'refresh',
+                      on_progress: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+                      ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Суммаризация новых новостей и выбор топ-новостей
+
+        Args:
+            all_news: Новости из лент
+            kind: Тип прогона для учета запросов к LLM
+            on_progress: Промежуточные списки новостей (см. summarize_new)
+
+        Returns:
+            Кортеж (все новости, топ-новости)
+        """
+        with self.llm_scope(kind):
+            summarized_news = await self.summarize_new(all_news, on_progress)
+            top_news = await self.select_top(summarized_news)
+        return summarized_news, top_news
+
+    async def close(self):
+        """
+        Закрытие клиентов, пула процессов парсинга и баз данных
+
+        Кэш лент не сохраняется: подтвержденные обновления уже записаны после
+        успешной обработки, а отложенные после сбоя должны быть отброшены.
+        """
+        await self.parser.close()
+        self.summarizer.close()
+        await self.summarizer.client.close()
+        self.store.close()
+        logger.info("Конвейер обработки новостей остановлен")
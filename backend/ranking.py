@@ -0,0 +1,107 @@
+"""
+Локальное ранжирование кандидатов в топ-новости
+"""
+import math
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def source_weights(sources_by_category: Dict[str, List[Dict[str, Any]]]) -> Dict[str, float]:
+    """
+    Веса источников из config.yaml (поле weight, по умолчанию 1.0)
+
+    Args:
+        sources_by_category: Словарь источников по категориям
+
+    Returns:
+        Веса по URL ленты
+    """
+    return {
+        source['url']: float(source.get('weight', 1.0))
+        for sources in sources_by_category.values()
+        for source in sources if source.get('url')
+    }
+
+
+class NewsRanker:
+    """Оценка новостей по свежести, охвату источниками и весу источника с балансом категорий"""
+
+    def __init__(self, half_life_hours: float = 12.0, coverage_weight: float = 1.0,
+                 category_penalty: float = 0.5, source_weights: Optional[Dict[str, float]] = None):
+        """
+        Инициализация
+
+        Args:
+            half_life_hours: Период, за который вклад свежести уменьшается вдвое
+            coverage_weight: Вклад количества источников, опубликовавших новость
+            category_penalty: Штраф за каждую уже выбранную новость той же категории
+            source_weights: Веса источников по URL ленты
+        """
+        self.half_life_hours = half_life_hours
+        self.coverage_weight = coverage_weight
+        self.category_penalty = category_penalty
+        self.source_weights = source_weights or {}
+
+    def score(self, news_item: Dict[str, Any], now: datetime) -> float:
+        """
+        Оценка значимости новости без учета категорий
+
+        Args:
+            news_item: Новость
+            now: Текущее время с часовым поясом
+
+        Returns:
+            Оценка (больше - значимее)
+        """
+        try:
+            # Даты публикации хранятся в UTC без часового пояса
+            published = datetime.strptime(news_item.get('published', ''), DATE_FORMAT).replace(tzinfo=timezone.utc)
+            age_hours = max(0.0, (now - published).total_seconds() / 3600)
+        except ValueError:
+            age_hours = self.half_life_hours
+        recency = 0.5 ** (age_hours / self.half_life_hours)
+
+        # Новость, которую опубликовали несколько источников, важнее
+        coverage = math.log1p(len(news_item.get('alternate_sources') or []))
+
+        weight = self.source_weights.get(news_item.get('source_url', ''), 1.0)
+        return weight * (recency + self.coverage_weight * coverage)
+
+    def rank(self, news_list: List[Dict[str, Any]], limit: int, now: Optional[datetime] = None) -> List[int]:
+        """
+        Выбор лучших новостей с балансом категорий
+
+        Новости выбираются жадно: оценка новости делится на (1 + штраф * число
+        уже выбранных новостей ее категории).
+
+        Args:
+            news_list: Список новостей
+            limit: Количество выбираемых новостей
+            now: Текущее время (по умолчанию datetime.now(timezone.utc), время без
+                часового пояса считается UTC)
+
+        Returns:
+            Индексы выбранных новостей в порядке убывания итоговой оценки
+        """
+        now = now or datetime.now(timezone.utc)
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+        scores = [self.score(news, now) for news in news_list]
+        remaining = sorted(range(len(news_list)), key=lambda i: -scores[i])
+
+        selected: List[int] = []
+        per_category: Dict[str, int] = {}
+        while remaining and len(selected) < limit:
+            best_position = max(
+                range(len(remaining)),
+                key=lambda p: scores[remaining[p]] / (
+                    1 + self.category_penalty * per_category.get(news_list[remaining[p]].get('category', ''), 0)
+                )
+            )
+            index = remaining.pop(best_position)
+            selected.append(index)
+            category = news_list[index].get('category', '')
+            per_category[category] = per_category.get(category, 0) + 1
+        return selected
@@ -1,80 +1,213 @@
 import feedparser
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
 import logging
+import time
+
+from compaction import compact_description
+from feed_cache import FeedCache
+from feed_fetcher import FeedFetcher
+from feed_replay import ReplayTransport, load_recorded_feeds
+from feed_stream import parse_feed_stream
+from lang_detect import detect_language
+from source_health import SourceHealth
+from news_store import make_news_id
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def parse_feed_content(content: Any, url: str, source_name: str, max_news: int,
+                       streaming: bool = False, description_tokens: int = 0) -> List[Dict[str, Any]]:
+    """
+    Парсинг RSS ленты в список словарей новостей
+    
+    Функция уровня модуля, чтобы ее можно было выполнять в пуле процессов.
+    Описания новостей очищаются от разметки и сокращаются до бюджета токенов,
+    язык заголовка сохраняется в поле lang.
+    
+    Args:
+        content: Содержимое ленты в байтах (если None, feedparser загрузит URL сам)
+        url: URL RSS ленты
+        source_name: Название источника
+        max_news: Максимальное количество новостей из источника
+        streaming: Использовать потоковый парсер с ранней остановкой
+        description_tokens: Бюджет токенов на описание новости (0 - без ограничения длины)
+        
+    Returns:
+        Список новостей из источника
+        
+    Raises:
+        ValueError: Если содержимое не удалось разобрать как ленту
+    """
+    news_list = _parse_news(content, url, source_name, max_news, streaming)
+    for news_item in news_list:
+        news_item['description'] = compact_description(news_item['description'], description_tokens)
+        # Язык заголовка определяется один раз, суммаризатор не анализирует текст повторно
+        news_item['lang'] = detect_language(news_item['title'])
+    return news_list
+
+
+def _parse_news(content: Any, url: str, source_name: str, max_news: int, streaming: bool) -> List[Dict[str, Any]]:
+    """Разбор ленты потоковым парсером или feedparser"""
+    if streaming and content is not None:
+        try:
+            news_list = parse_feed_stream(content, url, source_name, max_news)
+            if news_list:
+                logger.info(f"Получено {len(news_list)} новостей из {source_name} (потоковый парсинг)")
+                return news_list
+            # Например, RSS 0.9/RDF с другим пространством имен: записи найдет feedparser
+            logger.info(f"Потоковый парсер не нашел записей в {source_name}, используем feedparser")
+        except Exception as e:
+            logger.warning(f"Потоковый парсинг {source_name} не удался, используем feedparser: {e}")
+    
+    logger.info(f"Парсинг {source_name} ({url})")
+    feed = feedparser.parse(content if content is not None else url)
+    
+    if feed.bozo:
+        # Битый XML или HTML вместо ленты - ошибка источника, а не пустая лента
+        if not feed.entries:
+            raise ValueError(f"содержимое не разобрано как лента: {feed.bozo_exception}")
+        logger.warning(f"Возможные проблемы с RSS лентой {source_name}: {feed.bozo_exception}")
+    
+    news_list = []
+    for entry in feed.entries[:max_news]:
+        news_item = {
+            'id': make_news_id(entry.get('id'), entry.get('link', '')),
+            'title': entry.get('title', 'Без заголовка'),
+            'link': entry.get('link', ''),
+            'description': entry.get('summary', entry.get('description', '')),
+            'published': _parse_date(entry),
+            'source': source_name,
+            'source_url': url
+        }
+        news_list.append(news_item)
+    
+    logger.info(f"Получено {len(news_list)} новостей из {source_name}")
+    return news_list
+
+
+def _parse_date(entry: Any) -> str:
+    """
+    Парсинг даты публикации
+    
+    Args:
+        entry: Запись из RSS ленты
+        
+    Returns:
+        Отформатированная дата или пустую строку
+    """
+    try:
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            dt = datetime(*entry.published_parsed[:6])
+            return dt.strftime('%Y-%m-%d %H:%M:%S')
+        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+            dt = datetime(*entry.updated_parsed[:6])
+            return dt.strftime('%Y-%m-%d %H:%M:%S')
+        else:
+            return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    except Exception:
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
 class RSSParser:
-    def __init__(self, max_news_per_source: int = 7):
+    def __init__(self, max_news_per_source: int = 7, fetch_config: Optional[Dict[str, Any]] = None,
+                 feed_cache_path: Optional[str] = None, parse_workers: int = 0,
+                 streaming_parse: bool = False, source_health: Optional[SourceHealth] = None,
+                 description_tokens: int = 0):
         """
         Инициализация парсера
         
         Args:
             max_news_per_source: Максимальное количество новостей из источника
+            fetch_config: Настройки асинхронной загрузки лент (секция news.fetch из config.yaml)
+            feed_cache_path: Путь к кэшу лент для условных запросов (None - без кэша)
+            parse_workers: Размер пула процессов для парсинга XML (0 - парсинг в текущем процессе)
+            streaming_parse: Потоковый парсинг с остановкой после max_news_per_source записей
+            source_health: Реестр состояний источников с circuit breaker (общий для всех обновлений)
+            description_tokens: Бюджет токенов на описание новости (0 - без ограничения длины)
         """
         self.max_news_per_source = max_news_per_source
+        self.parse_workers = parse_workers
+        self.streaming_parse = streaming_parse
+        self.description_tokens = description_tokens
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.feed_cache = FeedCache(feed_cache_path) if feed_cache_path else None
+        self.source_health = source_health
+        # Статус каждой ленты в последнем обновлении: updated, not_modified, unchanged, skipped, error
+        self.feed_status: Dict[str, str] = {}
+        
+        fetch_config = fetch_config or {}
+        self.deadline = fetch_config.get('deadline', 20.0)
+        
+        # Режим воспроизведения записанных лент без обращения к сети
+        transport = None
+        if fetch_config.get('replay_dir'):
+            logger.info(f"Ленты воспроизводятся из {fetch_config['replay_dir']}")
+            transport = ReplayTransport(
+                load_recorded_feeds(fetch_config['replay_dir']),
+                latency=fetch_config.get('replay_latency', 0.0),
+                jitter=fetch_config.get('replay_jitter', 0.0)
+            )
+        
+        self.fetcher = FeedFetcher(
+            max_concurrency=fetch_config.get('max_concurrency', 10),
+            per_host_limit=fetch_config.get('per_host_limit', 2),
+            timeout=fetch_config.get('timeout', 10.0),
+            transport=transport
+        )
     
-    def parse_feed(self, url: str, source_name: str) -> List[Dict[str, Any]]:
+    def parse_feed(self, url: str, source_name: str, content: Optional[bytes] = None) -> List[Dict[str, Any]]:
         """
         Парсинг одной RSS ленты
         
         Args:
             url: URL RSS ленты
             source_name: Название источника
+            content: Уже загруженное содержимое ленты (если не передано, feedparser загрузит URL сам)
             
         Returns:
-            Список новостей из источника
+            Список новостей из источника (пустой при ошибке парсинга)
         """
         try:
-            logger.info(f"Парсинг {source_name} ({url})")
-            feed = feedparser.parse(url)
-            
-            if feed.bozo:
-                logger.warning(f"Возможные проблемы с RSS лентой {source_name}: {feed.bozo_exception}")
-            
-            news_list = []
-            for entry in feed.entries[:self.max_news_per_source]:
-                news_item = {
-                    'title': entry.get('title', 'Без заголовка'),
-                    'link': entry.get('link', ''),
-                    'description': entry.get('summary', entry.get('description', '')),
-                    'published': self._parse_date(entry),
-                    'source': source_name,
-                    'source_url': url
-                }
-                news_list.append(news_item)
-            
-            logger.info(f"Получено {len(news_list)} новостей из {source_name}")
-            return news_list
-            
+            return parse_feed_content(
+                content, url, source_name, self.max_news_per_source,
+                self.streaming_parse, self.description_tokens
+            )
         except Exception as e:
             logger.error(f"Ошибка при парсинге {source_name}: {e}")
             return []
     
-    def _parse_date(self, entry: Any) -> str:
+    async def _parse_feed_async(self, url: str, source_name: str, content: bytes) -> List[Dict[str, Any]]:
         """
-        Парсинг даты публикации
+        Парсинг загруженной ленты в пуле процессов
+        
+        feedparser нагружает CPU и держит GIL, поэтому разбор XML выполняется
+        в отдельных процессах, а обратно передаются только словари новостей.
         
         Args:
-            entry: Запись из RSS ленты
+            url: URL RSS ленты
+            source_name: Название источника
+            content: Содержимое ленты
             
         Returns:
-            Отформатированная дата или пустую строку
+            Список новостей из источника
+            
+        Raises:
+            ValueError: Если содержимое не удалось разобрать как ленту (ошибки
+                парсинга учитываются circuit breaker в fetch_feed)
         """
-        try:
-            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                dt = datetime(*entry.published_parsed[:6])
-                return dt.strftime('%Y-%m-%d %H:%M:%S')
-            elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                dt = datetime(*entry.updated_parsed[:6])
-                return dt.strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        args = (content, url, source_name, self.max_news_per_source, self.streaming_parse, self.description_tokens)
+        if self.parse_workers <= 0:
+            return parse_feed_content(*args)
+        
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, parse_feed_content, *args)
     
     def parse_all_sources(self, sources_by_category: Dict[str, List[Dict[str, str]]]) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -107,6 +240,179 @@ class RSSParser:
         
         return all_news
     
+    async def fetch_feed(self, url: str, source_name: str, deadline: Optional[float] = None,
+                         feed_status: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Асинхронная загрузка и парсинг одной RSS ленты
+        
+        Загрузка и парсинг ограничены общим дедлайном. Источники, отключенные
+        circuit breaker после серии ошибок, пропускаются до истечения паузы.
+        При ошибке или пропуске возвращаются последние новости из кэша лент.
+        
+        Args:
+            url: URL RSS ленты
+            source_name: Название источника
+            deadline: Дедлайн источника в секундах (по умолчанию из настроек загрузки)
+            feed_status: Куда записать состояние ленты (по умолчанию self.feed_status
+                полного обновления; у планового опроса свой словарь)
+            
+        Returns:
+            Список новостей из источника
+        """
+        if feed_status is None:
+            feed_status = self.feed_status
+        if self.source_health and not self.source_health.allow(url):
+            logger.warning(f"Источник {source_name} временно отключен, пропускаем")
+            feed_status[url] = 'skipped'
+            return self.feed_cache.cached_news(url) if self.feed_cache else []
+        
+        deadline = deadline or self.deadline
+        start_time = time.monotonic()
+        error = None
+        try:
+            news = await asyncio.wait_for(self._fetch_and_parse(url, source_name, feed_status), timeout=deadline)
+        except asyncio.TimeoutError:
+            error = f"превышен дедлайн {deadline} сек"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        
+        if error:
+            logger.error(f"Ошибка при загрузке {source_name}: {error}")
+            feed_status[url] = 'error'
+            if self.source_health:
+                self.source_health.record_failure(url, source_name, time.monotonic() - start_time, error)
+            return self.feed_cache.cached_news(url) if self.feed_cache else []
+        
+        if self.source_health:
+            self.source_health.record_success(url, source_name, time.monotonic() - start_time)
+        return news
+    
+    async def _fetch_and_parse(self, url: str, source_name: str, feed_status: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Условная загрузка ленты и парсинг измененного содержимого
+        
+        Args:
+            url: URL RSS ленты
+            source_name: Название источника
+            feed_status: Куда записать состояние ленты
+            
+        Returns:
+            Список новостей из источника
+            
+        Raises:
+            httpx.HTTPError: При ошибке загрузки
+        """
+        headers = self.feed_cache.conditional_headers(url) if self.feed_cache else None
+        result = await self.fetcher.fetch(url, headers=headers)
+        
+        if result['status'] == 304:
+            if self.feed_cache and self.feed_cache.get(url):
+                logger.info(f"Лента {source_name} не изменилась (304 Not Modified)")
+                feed_status[url] = 'not_modified'
+                return self.feed_cache.cached_news(url)
+            # Сохраненной версии нет (файл кэша удален или ответ на безусловный запрос):
+            # тела ответа нет, а ленту загрузим заново при следующем обновлении
+            logger.warning(f"Лента {source_name} ответила 304 без сохраненной версии")
+            feed_status[url] = 'not_modified'
+            return []
+        
+        if self.feed_cache:
+            content_hash = FeedCache.content_hash(result['content'])
+            record = self.feed_cache.get(url)
+            if record and record.get('content_hash') == content_hash:
+                logger.info(f"Лента {source_name} не изменилась (совпадает хэш содержимого)")
+                feed_status[url] = 'unchanged'
+                return self.feed_cache.cached_news(url)
+        
+        news = await self._parse_feed_async(url, source_name, result['content'])
+        feed_status[url] = 'updated'
+        
+        if self.feed_cache and news:
+            self.feed_cache.update(
+                url, content_hash, news,
+                etag=result.get('etag'),
+                last_modified=result.get('last_modified')
+            )
+        
+        return news
+    
+    async def parse_all_sources_async(self, sources_by_category: Dict[str, List[Dict[str, str]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Асинхронный парсинг всех источников по категориям
+        
+        Все ленты загружаются параллельно через общий HTTP клиент, поэтому
+        время обновления ограничено самой медленной лентой, а не их суммой.
+        
+        Args:
+            sources_by_category: Словарь источников по категориям
+            
+        Returns:
+            Словарь новостей по категориям
+        """
+        self.feed_status = {}
+        jobs = []
+        for category, sources in sources_by_category.items():
+            for source in sources:
+                url = source.get('url')
+                name = source.get('name', 'Неизвестный источник')
+                if url:
+                    jobs.append((category, self.fetch_feed(url, name, source.get('deadline'))))
+        
+        results = await asyncio.gather(*(job for _, job in jobs))
+        
+        all_news = {category: [] for category in sources_by_category}
+        for (category, _), news in zip(jobs, results):
+            for item in news:
+                item['category'] = category
+            all_news[category].extend(news)
+        
+        for category, category_news in all_news.items():
+            logger.info(f"Всего новостей в категории '{category}': {len(category_news)}")
+        
+        return all_news
+    
+    def has_changes(self) -> bool:
+        """
+        Проверка, изменилась ли хотя бы одна лента в последнем обновлении
+        
+        Returns:
+            True если хотя бы одна лента была загружена и распарсена заново
+        """
+        return any(status == 'updated' for status in self.feed_status.values())
+    
+    def has_responses(self) -> bool:
+        """
+        Проверка, ответила ли хотя бы одна лента в последнем обновлении
+        
+        Returns:
+            True если хотя бы одна лента загружена или подтверждена как неизмененная
+        """
+        return any(status in ('updated', 'not_modified', 'unchanged') for status in self.feed_status.values())
+    
+    def save_feed_cache(self, feed_status: Optional[Dict[str, str]] = None):
+        """
+        Применение обновлений кэша для заново загруженных лент и сохранение на диск
+        
+        Вызывается только после успешной обработки новостей: до этого обновления
+        отложены, и после сбоя ленты снова считаются измененными.
+        
+        Args:
+            feed_status: Состояния лент прогона (по умолчанию последнего полного обновления)
+        """
+        if not self.feed_cache:
+            return
+        if feed_status is None:
+            feed_status = self.feed_status
+        if self.feed_cache.commit([url for url, status in feed_status.items() if status == 'updated']):
+            self.feed_cache.save()
+    
+    async def close(self):
+        """Освобождение сетевых ресурсов и пула процессов парсера"""
+        await self.fetcher.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
     def get_all_news_flat(self, news_by_category: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
         """
         Получить плоский список всех новостей
@@ -0,0 +1,189 @@
+"""
+Адаптивный планировщик опроса RSS источников
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+PollCallback = Callable[[str, Dict[str, str]], Awaitable[List[Dict[str, Any]]]]
+
+
+def estimate_interval(published: List[str], min_interval: float, max_interval: float,
+                      default_interval: float, speedup: float = 0.5) -> float:
+    """
+    Оценка интервала опроса по частоте публикаций ленты
+
+    Args:
+        published: Даты публикации новостей ленты в формате '%Y-%m-%d %H:%M:%S'
+        min_interval: Минимальный интервал в секундах
+        max_interval: Максимальный интервал в секундах
+        default_interval: Интервал, если частоту публикаций оценить не удалось
+        speedup: Доля среднего промежутка между публикациями, через которую опрашиваем ленту
+
+    Returns:
+        Интервал опроса в секундах
+    """
+    timestamps = []
+    for value in published:
+        try:
+            timestamps.append(datetime.strptime(value, DATE_FORMAT).timestamp())
+        except (TypeError, ValueError):
+            continue
+
+    if len(timestamps) < 2:
+        return default_interval
+
+    timestamps.sort()
+    mean_gap = (timestamps[-1] - timestamps[0]) / (len(timestamps) - 1)
+    return max(min_interval, min(max_interval, mean_gap * speedup))
+
+
+class FeedScheduler:
+    """Опрашивает каждый источник с собственным интервалом, адаптированным к частоте публикаций"""
+
+    def __init__(self, sources_by_category: Dict[str, List[Dict[str, str]]], poll_source: PollCallback,
+                 min_interval: float = 300, max_interval: float = 21600,
+                 default_interval: float = 1800, jitter: float = 0.2):
+        """
+        Инициализация планировщика
+
+        Args:
+            sources_by_category: Словарь источников по категориям (rss_sources из config.yaml)
+            poll_source: Корутина опроса одного источника (категория, источник) -> новости ленты
+            min_interval: Минимальный интервал опроса в секундах
+            max_interval: Максимальный интервал опроса в секундах
+            default_interval: Интервал до первой оценки частоты публикаций
+            jitter: Относительный разброс интервала (0.2 - ±20%)
+        """
+        self.sources_by_category = sources_by_category
+        self.poll_source = poll_source
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.jitter = jitter
+
+        self.state: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        """Запуск задач опроса для всех источников"""
+        if self._tasks:
+            return
+
+        for category, sources in self.sources_by_category.items():
+            for source in sources:
+                url = source.get('url')
+                if not url:
+                    continue
+                self.state[url] = {
+                    'source': source.get('name', 'Неизвестный источник'),
+                    'category': category,
+                    'interval': self.default_interval,
+                    'last_run': None,
+                    'next_run': None,
+                    'last_duration': None,
+                    'last_count': 0
+                }
+                self._tasks.append(asyncio.create_task(self._run_source(category, source)))
+
+        logger.info(f"Планировщик запущен для {len(self._tasks)} источников")
+
+    async def stop(self):
+        """Остановка всех задач опроса"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Планировщик остановлен")
+
+    def source_lock(self, url: str) -> asyncio.Lock:
+        """
+        Блокировка источника, исключающая одновременные опросы одной ленты
+
+        Args:
+            url: URL RSS ленты
+
+        Returns:
+            Блокировка источника
+        """
+        if url not in self._locks:
+            self._locks[url] = asyncio.Lock()
+        return self._locks[url]
+
+    def _with_jitter(self, interval: float) -> float:
+        """Интервал со случайным разбросом"""
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule(self, url: str, delay: float):
+        """Запоминает время следующего опроса"""
+        self.state[url]['next_run'] = datetime.fromtimestamp(time.time() + delay).isoformat()
+
+    async def poll_now(self, category: str, source: Dict[str, str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Опрос источника, если он уже не опрашивается
+
+        Args:
+            category: Категория источника
+            source: Источник из config.yaml
+
+        Returns:
+            Новости ленты или None, если источник уже опрашивается
+        """
+        url = source['url']
+        lock = self.source_lock(url)
+        if lock.locked():
+            logger.info(f"Источник {source.get('name', url)} уже опрашивается, пропускаем")
+            return None
+
+        async with lock:
+            start_time = time.time()
+            news = await self.poll_source(category, source)
+            state = self.state.setdefault(url, {'source': source.get('name', url), 'category': category})
+            state['last_run'] = datetime.now().isoformat()
+            state['last_duration'] = round(time.time() - start_time, 3)
+            state['last_count'] = len(news)
+            state['interval'] = estimate_interval(
+                [news_item.get('published') for news_item in news],
+                self.min_interval, self.max_interval, self.default_interval
+            )
+            return news
+
+    async def _run_source(self, category: str, source: Dict[str, str]):
+        """Цикл опроса одного источника"""
+        url = source['url']
+        name = source.get('name', url)
+
+        # Разносим первые опросы во времени, чтобы не получить всплеск нагрузки при старте
+        delay = random.uniform(0, self.min_interval)
+        self._schedule(url, delay)
+        await asyncio.sleep(delay)
+
+        while True:
+            try:
+                await self.poll_now(category, source)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка планового опроса {name}: {e}")
+
+            delay = self._with_jitter(self.state[url]['interval'])
+            self._schedule(url, delay)
+            logger.info(f"Следующий опрос {name} через {delay / 60:.1f} мин")
+            await asyncio.sleep(delay)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        Состояние опроса всех источников
+
+        Returns:
+            Список состояний источников
+        """
+        return [{'url': url, **state} for url, state in self.state.items()]
@@ -0,0 +1,155 @@
+"""
+Состояние RSS источников и circuit breaker для проблемных лент
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class SourceHealth:
+    """Статистика задержек и ошибок источников с автоматическим отключением сбойных лент"""
+
+    def __init__(self, failure_threshold: int = 3, base_backoff: float = 60, max_backoff: float = 3600):
+        """
+        Инициализация реестра состояний
+
+        Args:
+            failure_threshold: Количество ошибок подряд, после которого источник отключается
+            base_backoff: Начальная пауза перед повторной попыткой в секундах
+            max_backoff: Максимальная пауза перед повторной попыткой в секундах
+        """
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.records: Dict[str, Dict[str, Any]] = {}
+
+    def _record(self, url: str, name: Optional[str] = None) -> Dict[str, Any]:
+        """Запись состояния источника (создается при первом обращении)"""
+        if url not in self.records:
+            self.records[url] = {
+                'source': name or url,
+                'state': STATE_CLOSED,
+                'consecutive_failures': 0,
+                'total_failures': 0,
+                'total_successes': 0,
+                'last_latency': None,
+                'avg_latency': None,
+                'last_error': None,
+                'last_success': None,
+                'last_failure': None,
+                'retry_at': 0.0,
+                'trial_started': None
+            }
+        elif name:
+            self.records[url]['source'] = name
+        return self.records[url]
+
+    def allow(self, url: str) -> bool:
+        """
+        Можно ли сейчас опрашивать источник
+
+        После истечения паузы источник переводится в half_open и получает одну пробную попытку:
+        пока ее результат не учтен, остальные обновления и опросы источник пропускают
+        (если результат так и не пришел, новая попытка разрешается через base_backoff).
+
+        Args:
+            url: URL RSS ленты
+
+        Returns:
+            True если запрос разрешен
+        """
+        record = self._record(url)
+        if record['state'] == STATE_CLOSED:
+            return True
+
+        now = time.time()
+        if record['state'] == STATE_OPEN:
+            if now < record['retry_at']:
+                return False
+            record['state'] = STATE_HALF_OPEN
+        elif record['trial_started'] is not None and now - record['trial_started'] < self.base_backoff:
+            return False
+
+        record['trial_started'] = now
+        logger.info(f"Пробный запрос к источнику {record['source']} после паузы")
+        return True
+
+    def _update_latency(self, record: Dict[str, Any], latency: float):
+        """Обновление последней и сглаженной средней задержки"""
+        record['last_latency'] = round(latency, 3)
+        if record['avg_latency'] is None:
+            record['avg_latency'] = round(latency, 3)
+        else:
+            record['avg_latency'] = round(0.8 * record['avg_latency'] + 0.2 * latency, 3)
+
+    def record_success(self, url: str, name: str, latency: float):
+        """
+        Учет успешного опроса источника
+
+        Args:
+            url: URL RSS ленты
+            name: Название источника
+            latency: Длительность опроса в секундах
+        """
+        record = self._record(url, name)
+        if record['state'] != STATE_CLOSED:
+            logger.info(f"Источник {name} снова доступен")
+        record['state'] = STATE_CLOSED
+        record['trial_started'] = None
+        record['consecutive_failures'] = 0
+        record['total_successes'] += 1
+        record['last_success'] = datetime.now().isoformat()
+        self._update_latency(record, latency)
+
+    def record_failure(self, url: str, name: str, latency: float, error: str):
+        """
+        Учет ошибки опроса источника
+
+        Args:
+            url: URL RSS ленты
+            name: Название источника
+            latency: Длительность опроса в секундах
+            error: Описание ошибки
+        """
+        record = self._record(url, name)
+        record['trial_started'] = None
+        record['consecutive_failures'] += 1
+        record['total_failures'] += 1
+        record['last_error'] = error
+        record['last_failure'] = datetime.now().isoformat()
+        self._update_latency(record, latency)
+
+        failures = record['consecutive_failures']
+        if record['state'] == STATE_HALF_OPEN or failures >= self.failure_threshold:
+            exponent = max(0, failures - self.failure_threshold)
+            backoff = min(self.max_backoff, self.base_backoff * (2 ** exponent))
+            record['state'] = STATE_OPEN
+            record['retry_at'] = time.time() + backoff
+            logger.warning(
+                f"Источник {name} отключен на {backoff:.0f} сек после {failures} ошибок подряд"
+            )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Состояние всех источников для API
+
+        Returns:
+            Список состояний источников
+        """
+        result = []
+        for url, record in self.records.items():
+            item = {key: value for key, value in record.items() if key not in ('retry_at', 'trial_started')}
+            item['url'] = url
+            item['retry_at'] = (
+                datetime.fromtimestamp(record['retry_at']).isoformat()
+                if record['state'] == STATE_OPEN else None
+            )
+            result.append(item)
+        return result
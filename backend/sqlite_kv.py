@@ -0,0 +1,122 @@
+"""
+Персистентное SQLite хранилище строк по ключу с вытеснением по размеру и возрасту
+"""
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteKV:
+    """Таблица ключ - значение с вытеснением давно не использованных и устаревших записей"""
+
+    def __init__(self, path: str, table: str, max_entries: int, max_age_days: int, name: str):
+        """
+        Инициализация хранилища
+
+        Args:
+            path: Путь к файлу базы данных
+            table: Имя таблицы
+            max_entries: Максимальное количество записей (вытесняются давно не использованные)
+            max_age_days: Максимальный возраст записи в днях
+            name: Название хранилища для логов
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+        self.conn.commit()
+
+    def _min_created(self) -> float:
+        """Время создания самой старой допустимой записи"""
+        return time.time() - self.max_age_days * 86400
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Получение значений по ключам (найденные записи отмечаются как использованные)
+
+        Args:
+            keys: Ключи записей
+
+        Returns:
+            Найденные значения по ключам
+        """
+        found: Dict[str, str] = {}
+        min_created = self._min_created()
+        unique_keys = list(dict.fromkeys(keys))
+        chunk_size = 500
+        for i in range(0, len(unique_keys), chunk_size):
+            chunk = unique_keys[i:i + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders}) AND created_at >= ?",
+                chunk + [min_created]
+            )
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                [(now, key) for key in found]
+            )
+            self.conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(unique_keys) - len(found)
+        return found
+
+    def put_many(self, values: Dict[str, str]):
+        """
+        Сохранение значений по ключам
+
+        Args:
+            values: Значения по ключам
+        """
+        if not values:
+            return
+        now = time.time()
+        self.conn.executemany(
+            f"""INSERT INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                    created_at = excluded.created_at, accessed_at = excluded.accessed_at""",
+            [(key, value, now, now) for key, value in values.items()]
+        )
+        self.conn.commit()
+
+    def prune(self):
+        """Удаление устаревших записей и вытеснение лишних по времени последнего использования"""
+        expired = self.conn.execute(
+            f"DELETE FROM {self.table} WHERE created_at < ?", (self._min_created(),)
+        ).rowcount
+        evicted = self.conn.execute(
+            f"""DELETE FROM {self.table} WHERE key IN (
+                    SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+            (self.max_entries,)
+        ).rowcount
+        self.conn.commit()
+        if expired or evicted:
+            logger.info(f"{self.name}: удалено {expired} устаревших и {evicted} вытесненных записей")
+
+    def close(self):
+        """Закрытие соединения с базой данных"""
+        self.conn.close()
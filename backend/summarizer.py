@@ -1,37 +1,297 @@
 import os
 import asyncio
-from typing import Dict, Any, List
+import json
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Tuple
 import logging
 import time
+import uuid
+from collections import deque
+from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from batching import AdaptiveBatcher
+from compaction import estimate_tokens
+from lang_detect import LANGUAGE_SCRIPTS, detect_language, filter_not_language, is_language
+from llm_metrics import LLMMetrics
+from llm_scheduler import LLMScheduler, llm_deadline
+from local_summarizer import LOCAL_BACKENDS
+from news_store import news_item_id
+from ranking import NewsRanker
+from summary_cache import SummaryCache
+from translation_memo import TranslationMemo
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Версия промпта batch суммаризации (входит в ключ кэша, меняется вместе с промптом)
+PROMPT_VERSION = 'batch-v1'
+STRUCTURED_PROMPT_VERSION = 'batch-json-v1'
+# Язык заголовков и резюме (промпты рассчитаны на русский)
+TARGET_LANGUAGE = 'ru'
+
+# Режимы суммаризации:
+#   llm          - только LLM (при ошибках резюме из начала описания)
+#   llm_fallback - LLM, при ошибках и без API ключа локальное резюме
+#   local        - только локальное резюме, без обращения к сети
+#   local_first  - сразу локальные резюме, затем замена резюме от LLM
+SUMMARIZER_MODES = ('llm', 'llm_fallback', 'local', 'local_first')
+
+# Конечные состояния пакетного задания Batch API
+BULK_TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+# JSON схема ответа пакетного перевода
+TRANSLATION_RESPONSE_SCHEMA = {
+    'name': 'translations',
+    'strict': True,
+    'schema': {
+        'type': 'object',
+        'properties': {
+            'items': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'id': {'type': 'string'},
+                        'text': {'type': 'string'}
+                    },
+                    'required': ['id', 'text'],
+                    'additionalProperties': False
+                }
+            }
+        },
+        'required': ['items'],
+        'additionalProperties': False
+    }
+}
+
+# JSON схема ответа batch суммаризации в режиме структурированного вывода
+BATCH_RESPONSE_SCHEMA = {
+    'name': 'news_summaries',
+    'strict': True,
+    'schema': {
+        'type': 'object',
+        'properties': {
+            'items': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'id': {'type': 'string'},
+                        'title': {'type': 'string'},
+                        'summary': {'type': 'string'}
+                    },
+                    'required': ['id', 'title', 'summary'],
+                    'additionalProperties': False
+                }
+            }
+        },
+        'required': ['items'],
+        'additionalProperties': False
+    }
+}
+
 
 class NewsSummarizer:
     """Класс для суммаризации новостей через OpenAI API"""
     
-    def __init__(self, api_config: Dict[str, Any]):
+    def __init__(self, api_config: Dict[str, Any], metrics: Optional[LLMMetrics] = None):
         """
         Инициализация суммаризатора
         
         Args:
             api_config: Конфигурация API из config.yaml
+            metrics: Общий учет запросов к LLM (по умолчанию создается свой)
         """
         self.api_key = os.getenv('OPENAI_API_KEY')
         if not self.api_key:
             logger.warning("API ключ для OpenAI не найден в переменных окружения")
         
-        # Инициализируем OpenAI клиент
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        # Инициализируем OpenAI клиент (повторы после 429 выполняет планировщик запросов).
+        # base_url позволяет направить запросы на OpenAI-совместимый сервер, например mock_openai.py
+        self.base_url = api_config.get('openai', {}).get('base_url') or None
+        self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
         
         # Настройки из конфигурации
         self.model = api_config.get('openai', {}).get('model', 'gpt-5-nano')
         self.temperature = api_config.get('openai', {}).get('temperature', 0.7)
         self.max_tokens = api_config.get('openai', {}).get('max_tokens', 500)
+        # Ответ batch суммаризации в виде JSON по схеме вместо нумерованных списков
+        self.structured_output = api_config.get('openai', {}).get('structured_output', False)
+        self.prompt_version = STRUCTURED_PROMPT_VERSION if self.structured_output else PROMPT_VERSION
+        
+        # Учет токенов, задержек и стоимости запросов по этапам
+        if metrics is None:
+            pricing_config = api_config.get('openai', {}).get('pricing', {})
+            metrics = LLMMetrics(
+                prompt_price=pricing_config.get('prompt_per_million', 0.0),
+                completion_price=pricing_config.get('completion_per_million', 0.0)
+            )
+        self.metrics = metrics
+        
+        # Планировщик запросов: ограничение параллельности и лимиты запросов/токенов в минуту
+        limits_config = api_config.get('rate_limits', {})
+        self.llm_scheduler = LLMScheduler(
+            max_in_flight=limits_config.get('max_in_flight', 4),
+            requests_per_minute=limits_config.get('requests_per_minute', 0),
+            tokens_per_minute=limits_config.get('tokens_per_minute', 0),
+            max_retries=limits_config.get('max_retries', 5),
+            max_backoff=limits_config.get('max_backoff', 30),
+            request_timeout=limits_config.get('request_timeout', 0),
+            hedge_percentile=limits_config.get('hedge_percentile', 0),
+            hedge_min_samples=limits_config.get('hedge_min_samples', 20)
+        )
+        # Общее время запросов к LLM за одно обновление (0 - без ограничения)
+        self.refresh_deadline = limits_config.get('refresh_deadline', 0)
+        
+        # Размер батчей по оценке токенов с адаптацией по задержкам и обрезкам ответов
+        batching_config = api_config.get('batching', {})
+        self.batcher = AdaptiveBatcher(
+            target_tokens=batching_config.get('target_tokens', 3000),
+            min_tokens=batching_config.get('min_tokens', 800),
+            max_tokens=batching_config.get('max_tokens', 12000),
+            max_completion_tokens=batching_config.get('max_completion_tokens', 4000),
+            completion_tokens_per_item=batching_config.get('completion_tokens_per_item', 150),
+            max_items=batching_config.get('max_items', 20),
+            target_latency=batching_config.get('target_latency', 30.0)
+        )
+        
+        # Режим суммаризации и локальная (экстрактивная) реализация
+        summarizer_config = api_config.get('summarizer', {})
+        self.mode = summarizer_config.get('mode', 'llm')
+        if self.mode not in SUMMARIZER_MODES:
+            logger.warning(f"Неизвестный режим суммаризации '{self.mode}', используется llm")
+            self.mode = 'llm'
+        self.local_backend = None
+        if self.mode != 'llm':
+            backend_name = summarizer_config.get('local_backend', 'textrank')
+            self.local_backend = LOCAL_BACKENDS[backend_name](
+                max_sentences=summarizer_config.get('max_sentences', 2),
+                max_chars=summarizer_config.get('max_chars', 400)
+            )
+        
+        # Пакетные задания (Batch API) для массовой суммаризации
+        bulk_config = api_config.get('bulk', {})
+        self.bulk_job_dir = Path(bulk_config.get('job_dir', 'output/bulk_jobs'))
+        self.bulk_poll_interval = bulk_config.get('poll_interval', 60)
+        self.bulk_max_wait = bulk_config.get('max_wait', 86400)
+        self.bulk_batcher = AdaptiveBatcher(
+            target_tokens=bulk_config.get('target_tokens', 6000),
+            max_completion_tokens=batching_config.get('max_completion_tokens', 4000),
+            completion_tokens_per_item=batching_config.get('completion_tokens_per_item', 150),
+            max_items=bulk_config.get('max_items', 40)
+        )
+        
+        # Выбор топ-новостей: локальное ранжирование и выбор из лучших кандидатов через LLM
+        top_config = api_config.get('top_news', {})
+        self.top_news_mode = top_config.get('mode', 'llm')
+        self.top_news_candidates = top_config.get('candidates', 40)
+        self.ranker = NewsRanker(
+            half_life_hours=top_config.get('half_life_hours', 12),
+            coverage_weight=top_config.get('coverage_weight', 1.0),
+            category_penalty=top_config.get('category_penalty', 0.5)
+        )
+        
+        # Кэш суммаризаций по содержимому новости
+        cache_config = api_config.get('summary_cache', {})
+        self.summary_cache: Optional[SummaryCache] = None
+        if cache_config.get('enabled', False):
+            self.summary_cache = SummaryCache(
+                cache_config.get('path', 'output/summary_cache.db'),
+                max_entries=cache_config.get('max_entries', 20000),
+                max_age_days=cache_config.get('max_age_days', 30)
+            )
+        
+        # Память переводов заголовков и резюме между запусками
+        memo_config = api_config.get('translation_memo', {})
+        self.translation_memo: Optional[TranslationMemo] = None
+        if memo_config.get('enabled', False):
+            self.translation_memo = TranslationMemo(
+                memo_config.get('path', 'output/translation_memo.db'),
+                max_entries=memo_config.get('max_entries', 50000),
+                max_age_days=memo_config.get('max_age_days', 30)
+            )
+    
+    def _cache_key(self, news_item: Dict[str, Any]) -> str:
+        """Ключ кэша суммаризаций для исходной новости"""
+        return SummaryCache.make_key(
+            self.model, self.prompt_version,
+            news_item.get('title', ''), news_item.get('description', '')
+        )
+    
+    async def _chat(self, prompt: str, stage: str = 'other', hedge: bool = False,
+                    stats: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        """
+        Запрос к chat completions через планировщик запросов
+        
+        Args:
+            prompt: Текст запроса пользователя
+            stage: Этап обработки для учета запросов (summary_batch, title_translation, ...)
+            hedge: Разрешить дублирующий запрос при задержке ответа (для batch запросов)
+            stats: Словарь для показателей запроса от LLMScheduler.run (retries, hedged, request_latency)
+            **kwargs: Дополнительные параметры запроса (temperature, max_tokens, ...)
+            
+        Returns:
+            Ответ OpenAI API
+        """
+        estimated_tokens = estimate_tokens(prompt) + kwargs.get('max_tokens', self.max_tokens)
+        if stats is None:
+            stats = {}
+        start_time = time.monotonic()
+        try:
+            response = await self.llm_scheduler.run(
+                lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    **kwargs
+                ),
+                estimated_tokens,
+                hedge=hedge,
+                stats=stats
+            )
+        except Exception as e:
+            self.metrics.record(
+                stage, latency=time.monotonic() - start_time, retries=stats.get('retries', 0),
+                hedged=stats.get('hedged', False), outcome=type(e).__name__
+            )
+            raise
+        self.metrics.record(
+            stage, response, latency=time.monotonic() - start_time, retries=stats.get('retries', 0),
+            hedged=stats.get('hedged', False)
+        )
+        return response
+    
+    def deadline_scope(self):
+        """Контекст, ограничивающий общее время запросов к LLM одного обновления"""
+        return llm_deadline(self.refresh_deadline)
+    
+    def close(self):
+        """Освобождение ресурсов суммаризатора"""
+        if self.summary_cache:
+            self.summary_cache.close()
+        if self.translation_memo:
+            self.translation_memo.close()
+    
+    def _memo_lookup(self, texts: List[str]) -> Dict[str, str]:
+        """Сохраненные переводы текстов (пустой словарь без памяти переводов)"""
+        if not self.translation_memo or not texts:
+            return {}
+        return self.translation_memo.get_many(texts, TARGET_LANGUAGE)
+    
+    def _memo_store(self, translations: Dict[str, str]):
+        """Сохранение полученных переводов в память переводов (только действительно переведенных)"""
+        if self.translation_memo and translations:
+            self.translation_memo.put_many(
+                {text: translation for text, translation in translations.items() if self._is_russian_text(translation)},
+                TARGET_LANGUAGE
+            )
+    
+    def _memo_titles(self, news_batch: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Сохраненные переводы заголовков батча, которым нужен перевод"""
+        return self._memo_lookup([news.get('title', '') for news in news_batch if not self._has_target_title(news)])
     
     async def translate_title(self, title: str) -> str:
         """
@@ -49,6 +309,10 @@ class NewsSummarizer:
         # Проверяем, нужен ли перевод (если уже на русском или пустой)
         if self._is_russian_text(title):
             return title
+        
+        memo = self._memo_lookup([title])
+        if title in memo:
+            return memo[title]
             
         prompt = f"""Переведи следующий заголовок новости на русский язык. Сохрани смысл и стиль заголовка.
 
@@ -64,16 +328,15 @@ class NewsSummarizer:
 ОТВЕТ (только переведенный заголовок):"""
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
+            response = await self._chat(
+                prompt,
+                stage='title_translation',
                 temperature=0.3,  # Низкая температура для более точного перевода
                 max_tokens=200
             )
             
             translated_title = response.choices[0].message.content.strip()
+            self._memo_store({title: translated_title})
             return translated_title
             
         except Exception as e:
@@ -90,25 +353,24 @@ class NewsSummarizer:
         Returns:
             True если текст на русском языке
         """
-        if not text:
-            return True
-            
-        # Подсчитываем количество русских символов
-        russian_chars = sum(1 for char in text if '\u0400' <= char <= '\u04FF')
-        # Подсчитываем количество латинских символов
-        latin_chars = sum(1 for char in text if char.isalpha() and ('\u0041' <= char <= '\u005A' or '\u0061' <= char <= '\u007A'))
-        total_alpha_chars = sum(1 for char in text if char.isalpha())
+        return is_language(text, TARGET_LANGUAGE)
+    
+    def _has_target_title(self, news_item: Dict[str, Any]) -> bool:
+        """
+        Проверяет, написан ли исходный заголовок новости на русском
         
-        # Если нет букв вообще, считаем русским
-        if total_alpha_chars == 0:
-            return True
-            
-        # Если больше латинских символов чем русских, считаем не русским
-        if latin_chars > russian_chars:
-            return False
+        Использует язык, определенный при сборе новостей (поле lang),
+        и анализирует заголовок только для новостей без этого поля. Заголовок
+        с нераспознанной письменностью (или без букв) отправляется на перевод.
+        
+        Args:
+            news_item: Исходная новость
             
-        # Если больше 30% русских символов от всех букв, считаем русским
-        return russian_chars / total_alpha_chars > 0.3
+        Returns:
+            True если перевод заголовка не нужен
+        """
+        lang = news_item['lang'] if 'lang' in news_item else detect_language(news_item.get('title', ''))
+        return lang is not None and LANGUAGE_SCRIPTS.get(lang) == LANGUAGE_SCRIPTS[TARGET_LANGUAGE]
 
     async def summarize_news(self, news_item: Dict[str, Any]) -> str:
         """
@@ -144,12 +406,14 @@ class NewsSummarizer:
         
         try:
             start_time = time.time()
-            result = await self._summarize_openai(prompt)
+            result = await self._summarize_openai(prompt, stage='summary_single')
             end_time = time.time()
             logger.info(f"Суммаризация заняла {end_time - start_time:.2f} секунд")
             return result
         except Exception as e:
             logger.error(f"Ошибка при суммаризации: {e}")
+            if self.local_backend:
+                return self.local_backend.summarize(news_item)
             # Fallback - создаем более качественное базовое резюме
             summary = f"{title}. "
             if description:
@@ -159,15 +423,10 @@ class NewsSummarizer:
                     summary += "..."
             return summary
     
-    async def _summarize_openai(self, prompt: str) -> str:
+    async def _summarize_openai(self, prompt: str, stage: str = 'other') -> str:
         """Суммаризация через OpenAI API"""
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            response = await self._chat(prompt, stage=stage)
             
             summary = response.choices[0].message.content.strip()
             return summary
@@ -176,77 +435,221 @@ class NewsSummarizer:
             logger.error(f"Ошибка при обращении к OpenAI API: {e}")
             raise e
     
-    async def summarize_all_news(self, news_list: List[Dict[str, Any]], batch_size: int = 5) -> List[Dict[str, Any]]:
+    async def summarize_all_news(self, news_list: List[Dict[str, Any]],
+                                 batch_size: Optional[int] = None,
+                                 on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+                                 ) -> List[Dict[str, Any]]:
         """
         Batch суммаризация всех новостей через OpenAI API
         
         Args:
             news_list: Список новостей для суммаризации
-            batch_size: Размер батча для обработки
+            batch_size: Фиксированный размер батча (по умолчанию батчи формируются по бюджету токенов)
+            on_batch: Вызывается с новостями каждого готового батча (и с новостями из кэша)
+                до финальной проверки переводов
             
         Returns:
             Список новостей с добавленными суммаризациями
         """
-        if not self.api_key:
+        if self.mode == 'local' or not self.api_key:
+            if self.local_backend:
+                result = self._summarize_locally(news_list)
+                if on_batch and result:
+                    on_batch(result)
+                return result
             logger.warning("API ключ не найден, пропускаем суммаризацию")
             return news_list
         
-        logger.info(f"Начинаем batch суммаризацию {len(news_list)} новостей (батчи по {batch_size})...")
-        start_time = time.time()
+        # Новости, уже суммаризированные с тем же содержимым, берем из кэша
+        all_summarized_news: List[Optional[Dict[str, Any]]] = [None] * len(news_list)
+        pending_indices = []
+        if self.summary_cache:
+            keys = [self._cache_key(news) for news in news_list]
+            cached = self.summary_cache.get_many(keys)
+            for i, (key, news) in enumerate(zip(keys, news_list)):
+                if key in cached:
+                    news_copy = news.copy()
+                    news_copy['title'] = cached[key]['title']
+                    news_copy['summary'] = cached[key]['summary']
+                    all_summarized_news[i] = news_copy
+                else:
+                    pending_indices.append(i)
+            logger.info(f"Из кэша суммаризаций взято {len(news_list) - len(pending_indices)} новостей")
+            if on_batch and len(pending_indices) < len(news_list):
+                on_batch([news for news in all_summarized_news if news is not None])
+        else:
+            pending_indices = list(range(len(news_list)))
         
-        # Разделяем новости на батчи
-        batches = [news_list[i:i + batch_size] for i in range(0, len(news_list), batch_size)]
-        logger.info(f"Создано {len(batches)} батчей")
+        # В режиме local_first все новости сразу получают локальные резюме (клиенты видят
+        # их через on_batch), которые затем заменяются резюме от LLM по мере готовности батчей.
+        # Новости батчей, для которых ответ LLM не получен, сохраняют локальное резюме
+        local_first = self.mode == 'local_first'
+        if local_first and pending_indices:
+            local_news = self._summarize_locally([news_list[i] for i in pending_indices])
+            for i, news in zip(pending_indices, local_news):
+                all_summarized_news[i] = news
+            if on_batch:
+                on_batch(local_news)
         
-        # Асинхронная обработка всех батчей одновременно
-        logger.info(f"Запускаем асинхронную обработку {len(batches)} батчей...")
+        sizing = f"батчи по {batch_size}" if batch_size else f"бюджет батча {self.batcher.target_tokens:.0f} токенов"
+        logger.info(f"Начинаем batch суммаризацию {len(pending_indices)} новостей ({sizing})...")
+        start_time = time.time()
+        
+        # Воркеры забирают батчи из общей очереди: размер следующего батча
+        # учитывает задержки и обрезки ответов уже выполненных запросов
+        pending = deque(pending_indices)
+        batch_counter = 0
         
-        async def process_batch_with_error_handling(batch, batch_index):
+        async def process_batch_with_error_handling(indices, batch_index):
+            batch = [news_list[i] for i in indices]
             try:
-                logger.info(f"Обрабатываем батч {batch_index + 1}/{len(batches)} ({len(batch)} новостей)")
+                logger.info(f"Обрабатываем батч {batch_index + 1} ({len(batch)} новостей)")
                 return await self._summarize_batch(batch, batch_index)
             except Exception as e:
                 logger.error(f"Ошибка при обработке батча {batch_index + 1}: {e}")
-                # Возвращаем новости без суммаризации
+                # Возвращаем новости без суммаризации (или с локальным резюме)
+                if local_first:
+                    return [all_summarized_news[i] for i in indices]
+                if self.local_backend:
+                    return self._summarize_locally(batch)
                 result = []
                 for news in batch:
                     news_copy = news.copy()
                     news_copy['summary'] = f"Ошибка batch суммаризации: {str(e)}"
+                    news_copy['summary_source'] = 'error'
                     result.append(news_copy)
                 return result
         
-        # Создаем задачи для всех батчей
-        tasks = [process_batch_with_error_handling(batch, batch_index) for batch_index, batch in enumerate(batches)]
+        async def worker():
+            nonlocal batch_counter
+            while pending:
+                indices = self.batcher.take_batch(pending, news_list, batch_size)
+                batch_index = batch_counter
+                batch_counter += 1
+                result = await process_batch_with_error_handling(indices, batch_index)
+                # Объединяем результаты в исходном порядке
+                for i, news in zip(indices, result):
+                    all_summarized_news[i] = news
+                if on_batch:
+                    on_batch(result)
         
-        # Выполняем все батчи параллельно
-        batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+        workers_count = min(self.llm_scheduler.max_in_flight, len(pending)) or 1
+        await asyncio.gather(*(worker() for _ in range(workers_count)))
+        logger.info(f"Обработано {batch_counter} батчей")
+        all_summarized_news = [news for news in all_summarized_news if news is not None]
         
-        # Объединяем результаты
-        all_summarized_news = []
-        for result in batch_results:
-            if isinstance(result, Exception):
-                logger.error(f"Батч завершился с ошибкой: {result}")
-                continue
-            all_summarized_news.extend(result)
+        if self.summary_cache:
+            self.summary_cache.prune()
+        if self.translation_memo:
+            self.translation_memo.prune()
         
         end_time = time.time()
-        logger.info(f"Batch суммаризация завершена за {end_time - start_time:.2f} секунд (в среднем {(end_time - start_time)/len(news_list):.2f} сек/новость)")
+        logger.info(f"Batch суммаризация завершена за {end_time - start_time:.2f} секунд (в среднем {(end_time - start_time)/max(len(pending_indices), 1):.2f} сек/новость)")
         
-        # Финальная проверка: убеждаемся, что все английские заголовки переведены
+        # Финальная проверка: непереведенные заголовки и резюме переводятся пакетно
         logger.info("Проводим финальную проверку переводов...")
-        for i, news in enumerate(all_summarized_news):
-            title = news.get('title', '')
-            if not self._is_russian_text(title):
-                logger.warning(f"Найден непереведенный заголовок #{i+1}: '{title}'")
-                try:
-                    translated_title = await self.translate_title(title)
-                    news['title'] = translated_title
-                    logger.info(f"Исправлен перевод заголовка #{i+1}: '{title}' -> '{translated_title}'")
-                except Exception as e:
-                    logger.error(f"Не удалось исправить перевод заголовка #{i+1}: {e}")
+        fields = [(i, field) for i in range(len(all_summarized_news)) for field in ('title', 'summary')]
+        texts = [all_summarized_news[i].get(field) or '' for i, field in fields]
+        untranslated = [fields[j] for j in filter_not_language(texts, TARGET_LANGUAGE)]
+        if untranslated:
+            logger.warning(f"Найдено {len(untranslated)} непереведенных заголовков и резюме")
+            translations = await self.translate_texts([all_summarized_news[i][field] for i, field in untranslated])
+            # Новости уже переданы в on_batch и могут быть опубликованы: переводы
+            # записываются в копии, которые попадут к клиентам со следующей публикацией
+            for (i, field), translated in zip(untranslated, translations):
+                all_summarized_news[i] = {**all_summarized_news[i], field: translated}
         
         return all_summarized_news
     
+    async def translate_texts(self, texts: List[str], chunk_size: int = 20) -> List[str]:
+        """
+        Пакетный перевод текстов на русский язык
+        
+        Тексты делятся на группы по chunk_size, каждая группа переводится одним
+        запросом, группы обрабатываются параллельно. Непереведенные тексты
+        возвращаются без изменений.
+        
+        Args:
+            texts: Тексты для перевода (заголовки или резюме)
+            chunk_size: Количество текстов в одном запросе
+            
+        Returns:
+            Переведенные тексты в исходном порядке
+        """
+        if not texts or not self.api_key:
+            return list(texts)
+        
+        # Сохраненные переводы подставляются без запроса к LLM
+        memo = self._memo_lookup(texts)
+        translated = [memo.get(text, text) for text in texts]
+        missing = [i for i, text in enumerate(texts) if text not in memo]
+        
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        results = await asyncio.gather(
+            *(self._translate_chunk([texts[i] for i in chunk]) for chunk in chunks),
+            return_exceptions=True
+        )
+        
+        fresh: Dict[str, str] = {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                logger.error(f"Ошибка при пакетном переводе {len(chunk)} текстов: {result}")
+                continue
+            for i, text in zip(chunk, result):
+                if text:
+                    translated[i] = text
+                    fresh[texts[i]] = text
+        self._memo_store(fresh)
+        
+        done = sum(1 for original, text in zip(texts, translated) if text != original)
+        logger.info(f"Пакетный перевод: переведено {done} из {len(texts)} текстов за {len(chunks)} запросов")
+        return translated
+    
+    async def _translate_chunk(self, texts: List[str]) -> List[Optional[str]]:
+        """
+        Перевод группы текстов одним запросом
+        
+        Args:
+            texts: Тексты для перевода
+            
+        Returns:
+            Переводы по порядку (None для текстов, которых нет в ответе)
+        """
+        entries = [{'id': str(i + 1), 'text': text} for i, text in enumerate(texts)]
+        prompt = f"""Переведи на русский язык следующие тексты новостей (заголовки и резюме), переданные в формате JSON.
+
+{json.dumps(entries, ensure_ascii=False, indent=1)}
+
+ИНСТРУКЦИИ:
+- Переведи точно и естественно, сохрани смысл, стиль и эмоциональную окраску
+- Не добавляй лишних слов
+- Если текст уже на русском языке, верни его без изменений
+
+Верни JSON объект {{"items": [{{"id": ..., "text": ...}}]}} с одним элементом на каждый текст.
+Поле id копируй из входных данных без изменений."""
+        
+        kwargs: Dict[str, Any] = {'temperature': 0.3}
+        if self.structured_output:
+            kwargs['response_format'] = {'type': 'json_schema', 'json_schema': TRANSLATION_RESPONSE_SCHEMA}
+        response = await self._chat(prompt, stage='batch_translation', **kwargs)
+        
+        content = response.choices[0].message.content.strip()
+        # Без структурированного вывода модель может обернуть JSON в блок кода
+        if content.startswith('```'):
+            content = content.strip('`').removeprefix('json').strip()
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            logger.warning(f"Не удалось разобрать JSON ответ перевода: {e}")
+            return [None] * len(texts)
+        
+        items = data.get('items', []) if isinstance(data, dict) else data
+        by_id = {
+            str(item.get('id', '')).strip(): str(item.get('text') or '').strip()
+            for item in (items if isinstance(items, list) else []) if isinstance(item, dict)
+        }
+        return [by_id.get(entry['id']) or None for entry in entries]
+    
     async def _summarize_batch(self, news_batch: List[Dict[str, Any]], batch_index: int) -> List[Dict[str, Any]]:
         """
         Batch суммаризация группы новостей через один запрос к OpenAI API
@@ -258,10 +661,20 @@ class NewsSummarizer:
         Returns:
             Список новостей с суммаризациями и переведенными заголовками
         """
+        if self.structured_output:
+            try:
+                return await self._summarize_batch_structured(news_batch)
+            except Exception as e:
+                logger.error(f"Ошибка при batch суммаризации батча {batch_index + 1}: {e}")
+                return await self._fallback_batch(news_batch)
+        
+        # Заголовки с сохраненным переводом передаются в промпт уже переведенными
+        memo_titles = self._memo_titles(news_batch)
+        
         # Формируем промпт для batch обработки
         news_texts = []
         for i, news in enumerate(news_batch):
-            title = news.get('title', '')
+            title = memo_titles.get(news.get('title', ''), news.get('title', ''))
             description = news.get('description', '')
             news_texts.append(f"НОВОСТЬ {i+1}:\nЗаголовок: {title}\nСодержание: {description}\n")
         
@@ -304,12 +717,10 @@ class NewsSummarizer:
 - Строго следуй формату ответа"""
 
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": batch_prompt}
-                ]
-            )
+            # Адаптивный размер батча учитывает только время самого запроса, без ожидания лимитов и повторов
+            request_stats: Dict[str, Any] = {}
+            response = await self._chat(batch_prompt, stage='summary_batch', hedge=True, stats=request_stats)
+            latency = request_stats['request_latency']
             
             batch_response = response.choices[0].message.content.strip()
             
@@ -318,6 +729,13 @@ class NewsSummarizer:
             translated_titles = parsed_data.get('titles', [])
             summaries = parsed_data.get('summaries', [])
             
+            # Обрезанный ответ или пропущенные резюме означают слишком большой батч
+            missing = sum(
+                1 for i in range(len(news_batch))
+                if i >= len(summaries) or summaries[i] == "Резюме недоступно"
+            )
+            self.batcher.record(latency, response.choices[0].finish_reason == 'length', missing)
+            
             # Добавляем переведенные заголовки и резюме к новостям
             result_news = []
             for i, news in enumerate(news_batch):
@@ -325,10 +743,13 @@ class NewsSummarizer:
                 
                 # Проверяем, нужен ли перевод заголовка
                 original_title = news.get('title', '')
-                if not self._is_russian_text(original_title):
-                    # Если заголовок не русский, используем переведенный
-                    if i < len(translated_titles) and translated_titles[i]:
+                if not self._has_target_title(news):
+                    # Если заголовок не русский, используем сохраненный или переведенный
+                    if original_title in memo_titles:
+                        news_copy['title'] = memo_titles[original_title]
+                    elif i < len(translated_titles) and translated_titles[i]:
                         news_copy['title'] = translated_titles[i]
+                        self._memo_store({original_title: translated_titles[i]})
                         logger.info(f"Переведен заголовок: '{original_title}' -> '{translated_titles[i]}'")
                     else:
                         # Fallback: пытаемся перевести отдельно
@@ -345,10 +766,16 @@ class NewsSummarizer:
                     logger.info(f"Заголовок уже на русском: '{original_title}'")
                 
                 # Добавляем резюме
-                summary = summaries[i] if i < len(summaries) else f"{news_copy['title']}. {news.get('description', '')[:200]}..."
+                if i < len(summaries) and summaries[i] != "Резюме недоступно":
+                    summary = summaries[i]
+                else:
+                    summary = self._fallback_summary(news_copy, news)
                 
                 # Проверяем, нужно ли переводить резюме
-                if not self._is_russian_text(summary):
+                summary_memo = {} if self._is_russian_text(summary) else self._memo_lookup([summary])
+                if summary in summary_memo:
+                    news_copy['summary'] = summary_memo[summary]
+                elif not self._is_russian_text(summary):
                     logger.warning(f"Резюме на английском языке, пытаемся перевести: '{summary[:100]}...'")
                     try:
                         # Создаем простой промпт для перевода резюме
@@ -358,15 +785,16 @@ class NewsSummarizer:
 
 Переведи точно и естественно на русский язык, сохранив смысл и структуру."""
                         
-                        translate_response = await self.client.chat.completions.create(
-                            model=self.model,
-                            messages=[{"role": "user", "content": translate_prompt}],
+                        translate_response = await self._chat(
+                            translate_prompt,
+                            stage='summary_translation',
                             temperature=0.3,
                             max_tokens=300
                         )
                         
                         translated_summary = translate_response.choices[0].message.content.strip()
                         news_copy['summary'] = translated_summary
+                        self._memo_store({summary: translated_summary})
                         logger.info(f"Переведено резюме: '{summary[:50]}...' -> '{translated_summary[:50]}...'")
                     except Exception as e:
                         logger.error(f"Не удалось перевести резюме: {e}")
@@ -374,31 +802,230 @@ class NewsSummarizer:
                 else:
                     news_copy['summary'] = summary
                 result_news.append(news_copy)
+                
+                # В кэш попадают только резюме, полученные от модели
+                if self.summary_cache and i < len(summaries) and summaries[i] != "Резюме недоступно":
+                    self.summary_cache.put(self._cache_key(news), news_copy['title'], news_copy['summary'])
             
             return result_news
             
         except Exception as e:
             logger.error(f"Ошибка при batch суммаризации батча {batch_index + 1}: {e}")
-            # Возвращаем новости с fallback резюме и принудительным переводом заголовков
-            result_news = []
-            for news in news_batch:
-                news_copy = news.copy()
-                
-                # Принудительно переводим заголовок, если он не русский
-                original_title = news.get('title', '')
-                if not self._is_russian_text(original_title):
-                    try:
-                        translated_title = await self.translate_title(original_title)
-                        news_copy['title'] = translated_title
-                        logger.info(f"Fallback перевод заголовка: '{original_title}' -> '{translated_title}'")
-                    except Exception as translate_error:
-                        logger.error(f"Не удалось перевести заголовок в fallback: {translate_error}")
-                        news_copy['title'] = original_title
-                
-                # Создаем базовое резюме
-                news_copy['summary'] = f"{news_copy['title']}. {news.get('description', '')[:200]}..."
+            return await self._fallback_batch(news_batch)
+    
+    def _fallback_summary(self, news_copy: Dict[str, Any], news_item: Dict[str, Any]) -> str:
+        """
+        Резюме новости, для которой не удалось получить ответ LLM
+        
+        Args:
+            news_copy: Результирующая копия новости (получает summary_source: local или fallback)
+            news_item: Исходная новость
+            
+        Returns:
+            Локальное резюме или начало описания
+        """
+        if self.local_backend:
+            news_copy['summary_source'] = 'local'
+            return self.local_backend.summarize(news_item)
+        news_copy['summary_source'] = 'fallback'
+        return f"{news_copy.get('title', '')}. {news_item.get('description', '')[:200]}..."
+    
+    def _summarize_locally(self, news_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Локальная суммаризация без обращения к LLM
+        
+        Args:
+            news_list: Список новостей
+            
+        Returns:
+            Копии новостей с локальными резюме (summary_source = 'local')
+        """
+        start_time = time.time()
+        result = []
+        for news, summary in zip(news_list, self.local_backend.summarize_many(news_list)):
+            news_copy = news.copy()
+            news_copy['summary'] = summary
+            news_copy['summary_source'] = 'local'
+            result.append(news_copy)
+        logger.info(f"Локальная суммаризация {len(news_list)} новостей заняла {time.time() - start_time:.3f} секунд")
+        return result
+    
+    async def _fallback_batch(self, news_batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Новости батча с базовым резюме и принудительным переводом заголовков
+        
+        Args:
+            news_batch: Батч новостей, для которого не удалось получить ответ LLM
+            
+        Returns:
+            Список новостей с fallback резюме
+        """
+        result_news = []
+        for news in news_batch:
+            news_copy = news.copy()
+            
+            # Принудительно переводим заголовок, если он не русский
+            original_title = news.get('title', '')
+            if not self._has_target_title(news):
+                try:
+                    translated_title = await self.translate_title(original_title)
+                    news_copy['title'] = translated_title
+                    logger.info(f"Fallback перевод заголовка: '{original_title}' -> '{translated_title}'")
+                except Exception as translate_error:
+                    logger.error(f"Не удалось перевести заголовок в fallback: {translate_error}")
+                    news_copy['title'] = original_title
+            
+            # Создаем базовое резюме
+            news_copy['summary'] = self._fallback_summary(news_copy, news)
+            result_news.append(news_copy)
+        return result_news
+    
+    def _build_structured_prompt(self, entries: List[Tuple[str, Dict[str, Any]]]) -> str:
+        """
+        Промпт batch суммаризации с ответом в виде JSON
+        
+        Args:
+            entries: Пары (id, новость)
+            
+        Returns:
+            Текст промпта
+        """
+        news_json = json.dumps(
+            [
+                {'id': news_id, 'title': news.get('title', ''), 'content': news.get('description', '')}
+                for news_id, news in entries
+            ],
+            ensure_ascii=False,
+            indent=1
+        )
+        return f"""Ты - профессиональный журналист и переводчик. Ниже {len(entries)} новостей в формате JSON.
+
+{news_json}
+
+Для каждой новости:
+1. title - заголовок на русском языке (если заголовок уже на русском, оставь его без изменений; переводи точно и естественно, сохраняя стиль, без лишних слов)
+2. summary - краткое резюме на русском языке (2-3 предложения: ключевые факты, кто, что, когда, где и почему)
+
+Верни JSON объект {{"items": [{{"id": ..., "title": ..., "summary": ...}}]}} с одним элементом на каждую новость.
+Поле id копируй из входных данных без изменений."""
+    
+    def _parse_structured_response(self, content: str) -> Dict[str, Dict[str, str]]:
+        """
+        Разбор JSON ответа batch суммаризации
+        
+        Args:
+            content: Текст ответа LLM
+            
+        Returns:
+            Заголовки и резюме по id новости (пустые и некорректные элементы пропускаются)
+        """
+        try:
+            data = json.loads(content)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Не удалось разобрать JSON ответ: {e}")
+            return {}
+        
+        items = data.get('items', []) if isinstance(data, dict) else data
+        result: Dict[str, Dict[str, str]] = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            news_id = str(item.get('id', '')).strip()
+            summary = str(item.get('summary') or '').strip()
+            if news_id and summary:
+                result[news_id] = {'title': str(item.get('title') or '').strip(), 'summary': summary}
+        return result
+    
+    async def _request_structured(
+        self, entries: List[Tuple[str, Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Dict[str, str]], bool, float]:
+        """
+        Запрос batch суммаризации со структурированным ответом
+        
+        Args:
+            entries: Пары (id, новость)
+            
+        Returns:
+            Кортеж (результаты по id, признак обрезки ответа, длительность самого запроса
+            без ожидания лимитов и повторов)
+        """
+        request_stats: Dict[str, Any] = {}
+        response = await self._chat(
+            self._build_structured_prompt(entries),
+            stage='summary_batch',
+            hedge=True,
+            stats=request_stats,
+            response_format={'type': 'json_schema', 'json_schema': BATCH_RESPONSE_SCHEMA}
+        )
+        choice = response.choices[0]
+        return (
+            self._parse_structured_response(choice.message.content),
+            choice.finish_reason == 'length',
+            request_stats['request_latency']
+        )
+    
+    async def _summarize_batch_structured(self, news_batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Batch суммаризация со структурированным JSON ответом
+        
+        Результаты сопоставляются с новостями строго по id. Для новостей, которых
+        нет в ответе, выполняется один повторный запрос только с ними.
+        
+        Args:
+            news_batch: Батч новостей для суммаризации
+            
+        Returns:
+            Список новостей с суммаризациями и переведенными заголовками
+        """
+        entries = [(str(i + 1), news) for i, news in enumerate(news_batch)]
+        
+        # Заголовки с сохраненным переводом передаются в промпт уже переведенными
+        memo_titles = self._memo_titles(news_batch)
+        prompt_entries = []
+        for news_id, news in entries:
+            title = news.get('title', '')
+            prompt_entries.append((news_id, {**news, 'title': memo_titles[title]} if title in memo_titles else news))
+        
+        results, truncated, latency = await self._request_structured(prompt_entries)
+        
+        missing = [entry for entry in prompt_entries if entry[0] not in results]
+        self.batcher.record(latency, truncated, len(missing))
+        
+        if missing:
+            logger.warning(f"В ответе нет {len(missing)} из {len(entries)} новостей, повторяем запрос для них")
+            # Ошибка повторного запроса не отменяет результаты первого: резервное резюме получат только пропущенные
+            try:
+                repaired, _, _ = await self._request_structured(missing)
+                results.update({news_id: repaired[news_id] for news_id, _ in missing if news_id in repaired})
+            except Exception as e:
+                logger.error(f"Ошибка повторного запроса для {len(missing)} пропущенных новостей: {e}")
+        
+        result_news = []
+        for news_id, news in entries:
+            news_copy = news.copy()
+            item = results.get(news_id)
+            if item is None:
+                # Итоговая проверка переводов в summarize_all_news переведет заголовок отдельно
+                news_copy['summary'] = self._fallback_summary(news_copy, news)
                 result_news.append(news_copy)
-            return result_news
+                continue
+            
+            original_title = news.get('title', '')
+            if original_title in memo_titles:
+                news_copy['title'] = memo_titles[original_title]
+            elif not self._has_target_title(news) and item['title']:
+                news_copy['title'] = item['title']
+                self._memo_store({original_title: item['title']})
+            news_copy['summary'] = item['summary']
+            result_news.append(news_copy)
+            
+            if self.summary_cache:
+                self.summary_cache.put(self._cache_key(news), news_copy['title'], news_copy['summary'])
+        
+        unresolved = len(entries) - sum(1 for news_id, _ in entries if news_id in results)
+        if unresolved:
+            logger.warning(f"Не получено резюме для {unresolved} новостей после повторного запроса")
+        return result_news
     
     def _parse_batch_response(self, response: str, expected_count: int) -> Dict[str, List[str]]:
         """
@@ -507,28 +1134,283 @@ class NewsSummarizer:
         
         return summaries[:expected_count]
     
-    async def select_top_news(self, news_list: List[Dict[str, Any]], top_count: int = 5) -> List[Dict[str, Any]]:
+    def build_bulk_requests(
+        self, news_list: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+        """
+        Запросы пакетного задания: batch промпты со структурированным ответом
+        
+        Новости в промпте идентифицируются своим id, поэтому результаты задания
+        сопоставляются с новостями без дополнительного состояния.
+        
+        Args:
+            news_list: Новости для суммаризации
+            
+        Returns:
+            Кортеж (строки JSONL файла задания, id новостей по custom_id запроса);
+            списки пустые, если новостей нет
+        """
+        pending = deque(range(len(news_list)))
+        requests = []
+        request_items: Dict[str, List[str]] = {}
+        while pending:
+            entries = [
+                (news_item_id(news_list[i]), news_list[i])
+                for i in self.bulk_batcher.take_batch(pending, news_list)
+            ]
+            body: Dict[str, Any] = {
+                'model': self.model,
+                'messages': [{'role': 'user', 'content': self._build_structured_prompt(entries)}]
+            }
+            if self.structured_output:
+                body['response_format'] = {'type': 'json_schema', 'json_schema': BATCH_RESPONSE_SCHEMA}
+            custom_id = f"bulk-{len(requests) + 1}"
+            requests.append({
+                'custom_id': custom_id,
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': body
+            })
+            request_items[custom_id] = [news_id for news_id, _ in entries]
+        return requests, request_items
+    
+    async def submit_bulk_job(self, news_list: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Запись запросов в JSONL файл и отправка асинхронного пакетного задания
+        
+        Args:
+            news_list: Новости для суммаризации
+            
+        Returns:
+            Описание задания (сохраняется в <batch_id>.json рядом с JSONL файлом)
+            или None, если новостей нет
+        """
+        requests, request_items = self.build_bulk_requests(news_list)
+        if not requests:
+            logger.info("Нет новостей для пакетного задания")
+            return None
+        self.bulk_job_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{datetime.now().strftime('bulk-%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        input_path = self.bulk_job_dir / f"{name}.jsonl"
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for request in requests:
+                f.write(json.dumps(request, ensure_ascii=False) + '\n')
+        
+        uploaded = await self.client.files.create(file=input_path, purpose='batch')
+        batch = await self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h',
+            metadata={'prompt_version': self.prompt_version, 'items': str(len(news_list))}
+        )
+        job = {
+            'name': name,
+            'batch_id': batch.id,
+            'input_file_id': uploaded.id,
+            'input_path': str(input_path),
+            'items': len(news_list),
+            'requests': len(requests),
+            'created_at': datetime.now().isoformat(),
+            # id новостей каждого запроса: по ним повторно отправляются новости из неудачных запросов
+            'request_items': request_items
+        }
+        self._save_bulk_job(job)
+        logger.info(f"Отправлено пакетное задание {batch.id}: {len(news_list)} новостей в {len(requests)} запросах")
+        return job
+    
+    def _save_bulk_job(self, job: Dict[str, Any]):
+        """Сохранение описания задания в <batch_id>.json"""
+        with open(self.bulk_job_dir / f"{job['batch_id']}.json", 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+    
+    def load_bulk_job(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Описание задания, отправленного из этого каталога заданий
+        
+        Args:
+            batch_id: Идентификатор задания
+            
+        Returns:
+            Описание задания или None, если оно не найдено
+        """
+        path = self.bulk_job_dir / f"{batch_id}.json"
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def record_bulk_failures(self, batch_id: str, outcomes: Dict[str, str]) -> List[str]:
+        """
+        Запись id новостей из неудачных запросов в описание задания
+        
+        Неудачными считаются запросы с ошибкой и запросы без результата
+        (например, если задание истекло или было отменено).
+        
+        Args:
+            batch_id: Идентификатор задания
+            outcomes: Результаты запросов по custom_id (completed или failed) из iter_bulk_results
+            
+        Returns:
+            id новостей, которые нужно отправить повторно
+        """
+        job = self.load_bulk_job(batch_id)
+        if job is None:
+            if any(outcome != 'completed' for outcome in outcomes.values()):
+                logger.warning(f"Описание задания {batch_id} не найдено, id новостей неудачных запросов неизвестны")
+            return []
+        
+        request_items = job.get('request_items', {})
+        failed_requests = [custom_id for custom_id in request_items if outcomes.get(custom_id) != 'completed']
+        failed_items = [news_id for custom_id in failed_requests for news_id in request_items[custom_id]]
+        job['failed_requests'] = failed_requests
+        job['failed_items'] = failed_items
+        self._save_bulk_job(job)
+        if failed_items:
+            logger.warning(f"Задание {batch_id}: {len(failed_items)} новостей из неудачных запросов "
+                           f"записаны в описание задания для повторной отправки")
+        return failed_items
+    
+    async def wait_bulk_job(self, batch_id: str) -> Any:
+        """
+        Ожидание завершения пакетного задания
+        
+        Args:
+            batch_id: Идентификатор задания
+            
+        Returns:
+            Задание в конечном состоянии
+            
+        Raises:
+            asyncio.TimeoutError: Если задание не завершилось за bulk.max_wait секунд
+        """
+        deadline = time.monotonic() + self.bulk_max_wait
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            if counts:
+                logger.info(f"Задание {batch_id}: {batch.status}, выполнено {counts.completed} из {counts.total}, "
+                            f"ошибок {counts.failed}")
+            if batch.status in BULK_TERMINAL_STATUSES:
+                return batch
+            if time.monotonic() + self.bulk_poll_interval > deadline:
+                raise asyncio.TimeoutError(f"Задание {batch_id} не завершилось за {self.bulk_max_wait} сек")
+            await asyncio.sleep(self.bulk_poll_interval)
+    
+    async def iter_bulk_results(self, batch: Any,
+                                outcomes: Optional[Dict[str, str]] = None) -> AsyncIterator[Dict[str, Dict[str, str]]]:
+        """
+        Потоковое чтение результатов завершенного задания
+        
+        Args:
+            batch: Задание в конечном состоянии
+            outcomes: Словарь, в который записывается результат каждого запроса по custom_id
+                (completed или failed)
+            
+        Yields:
+            Заголовки и резюме по id новости для каждого запроса задания
+        """
+        if outcomes is None:
+            outcomes = {}
+        if batch.error_file_id:
+            failed = []
+            async with self.client.files.with_streaming_response.content(batch.error_file_id) as response:
+                async for line in response.iter_lines():
+                    if line.strip():
+                        failed.append(json.loads(line).get('custom_id'))
+            outcomes.update((custom_id, 'failed') for custom_id in failed)
+            if failed:
+                logger.warning(f"Задание {batch.id}: {len(failed)} запросов завершились ошибкой: {failed[:10]}")
+        
+        if not batch.output_file_id:
+            logger.warning(f"Задание {batch.id} ({batch.status}) не содержит результатов")
+            return
+        
+        async with self.client.files.with_streaming_response.content(batch.output_file_id) as response:
+            async for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                result = record.get('response') or {}
+                if record.get('error') or result.get('status_code') != 200:
+                    logger.warning(f"Запрос {record.get('custom_id')} задания завершился ошибкой: "
+                                   f"{record.get('error') or result.get('body')}")
+                    outcomes[record.get('custom_id')] = 'failed'
+                    self.metrics.record('bulk_summary', outcome='error')
+                    continue
+                
+                outcomes[record.get('custom_id')] = 'completed'
+                completion = ChatCompletion.model_validate(result['body'])
+                self.metrics.record('bulk_summary', completion)
+                content = (completion.choices[0].message.content or '').strip()
+                # Без структурированного вывода модель может обернуть JSON в блок кода
+                if content.startswith('```'):
+                    content = content.strip('`').removeprefix('json').strip()
+                yield self._parse_structured_response(content)
+    
+    def apply_bulk_results(self, news_list: List[Dict[str, Any]],
+                           results: Dict[str, Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Новости с заголовками и резюме из результатов задания
+        
+        Args:
+            news_list: Новости, для которых есть результаты
+            results: Заголовки и резюме по id новости
+            
+        Returns:
+            Обновленные копии новостей
+        """
+        updated = []
+        for news in news_list:
+            item = results.get(news_item_id(news))
+            if item is None:
+                continue
+            news_copy = news.copy()
+            if not self._has_target_title(news) and item['title']:
+                news_copy['title'] = item['title']
+            news_copy['summary'] = item['summary']
+            news_copy.pop('summary_source', None)
+            updated.append(news_copy)
+        return updated
+    
+    async def select_top_news(self, news_list: List[Dict[str, Any]], top_count: int = 5,
+                              source_weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
         """
         Выбор самых интересных новостей дня с помощью LLM
         
+        Новости предварительно ранжируются локально (свежесть, охват источниками,
+        вес источника, баланс категорий), в LLM передаются только лучшие кандидаты.
+        В режиме local топ-новости выбираются без LLM.
+        
         Args:
             news_list: Список всех новостей с суммаризацией
             top_count: Количество топ-новостей
+            source_weights: Веса источников по URL ленты
             
         Returns:
             Список топ-новостей
         """
         logger.info(f"Выбираем топ-{top_count} новостей из {len(news_list)}...")
+        if source_weights is not None:
+            self.ranker.source_weights = source_weights
+        
+        if self.top_news_mode == 'local' or not self.api_key:
+            top_news = [news_list[i] for i in self.ranker.rank(news_list, top_count)]
+            logger.info(f"Выбрано {len(top_news)} топ-новостей локальным ранжированием")
+            return top_news
+        
+        candidate_indices = self.ranker.rank(news_list, max(self.top_news_candidates, top_count))
+        candidates = [news_list[i] for i in candidate_indices]
+        logger.info(f"Для выбора через LLM отобрано {len(candidates)} кандидатов")
         
         news_summaries = []
-        for i, news in enumerate(news_list):
+        for i, news in enumerate(candidates):
             news_summaries.append(
                 f"{i+1}. [{news.get('category', 'общее').upper()}] {news.get('title', '')}\n"
                 f"   📝 {news.get('summary', '')}\n"
                 f"   📍 Источник: {news.get('source', '')}\n\n"
             )
         
-        prompt = f"""Ты - опытный редактор новостного агентства. Проанализируй следующие {len(news_list)} новостей и выбери {top_count} САМЫХ ИНТЕРЕСНЫХ и ЗНАЧИМЫХ новостей дня.
+        prompt = f"""Ты - опытный редактор новостного агентства. Проанализируй следующие {len(candidates)} новостей и выбери {top_count} САМЫХ ИНТЕРЕСНЫХ и ЗНАЧИМЫХ новостей дня.
 
 КРИТЕРИИ ВЫБОРА:
 1. Актуальность и свежесть информации
@@ -546,24 +1428,24 @@ class NewsSummarizer:
 ОТВЕТ (только номера):"""
         
         try:
-            response = await self._summarize_openai(prompt)
+            response = await self._summarize_openai(prompt, stage='top_selection')
             # Парсим ответ и извлекаем индексы
             selected_indices = []
             for part in response.replace(' ', '').split(','):
                 try:
                     idx = int(part.strip()) - 1  # Преобразуем в 0-индексированный
-                    if 0 <= idx < len(news_list):
+                    if 0 <= idx < len(candidates) and idx not in selected_indices:
                         selected_indices.append(idx)
                 except ValueError:
                     continue
-            # Если LLM не вернул корректный ответ, берем первые top_count новостей
+            # Если LLM не вернул корректный ответ, берем лучших кандидатов локального ранжирования
             if len(selected_indices) < top_count:
-                logger.warning("LLM не вернул достаточно индексов, берем первые новости")
-                selected_indices = list(range(min(top_count, len(news_list))))
+                logger.warning("LLM не вернул достаточно индексов, берем лучших кандидатов")
+                selected_indices = list(range(min(top_count, len(candidates))))
             selected_indices = selected_indices[:top_count]
-            top_news = [news_list[i] for i in selected_indices]
+            top_news = [candidates[i] for i in selected_indices]
             logger.info(f"Выбрано {len(top_news)} топ-новостей")
             return top_news
         except Exception as e:
             logger.error(f"Ошибка при выборе топ-новостей: {e}")
-            return news_list[:top_count]
\ No newline at end of file
+            return candidates[:top_count]
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Персистентный кэш суммаризаций, адресуемый по содержимому новости
+"""
+import hashlib
+import json
+from typing import Dict, Any, List, Optional
+
+from sqlite_kv import SQLiteKV
+
+
+class SummaryCache:
+    """Кэш переведенных заголовков и резюме поверх SQLiteKV"""
+
+    def __init__(self, path: str = 'output/summary_cache.db', max_entries: int = 20000, max_age_days: int = 30):
+        """
+        Инициализация кэша
+
+        Args:
+            path: Путь к файлу базы данных
+            max_entries: Максимальное количество записей (вытесняются давно не использованные)
+            max_age_days: Максимальный возраст записи в днях
+        """
+        self.store = SQLiteKV(path, 'summaries', max_entries, max_age_days, "Кэш суммаризаций")
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, title: str, description: str) -> str:
+        """
+        Ключ кэша по модели, версии промпта и содержимому новости
+
+        Args:
+            model: Модель LLM
+            prompt_version: Версия промпта суммаризации
+            title: Исходный заголовок
+            description: Исходное описание
+
+        Returns:
+            Ключ записи
+        """
+        raw = '\x1f'.join((model, prompt_version, title or '', description or ''))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Получение записей по ключам
+
+        Args:
+            keys: Ключи записей
+
+        Returns:
+            Найденные записи ({'title', 'summary'}) по ключам
+        """
+        return {key: json.loads(data) for key, data in self.store.get_many(keys).items()}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Получение одной записи"""
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, title: str, summary: str):
+        """
+        Сохранение переведенного заголовка и резюме
+
+        Args:
+            key: Ключ записи
+            title: Переведенный заголовок
+            summary: Резюме
+        """
+        self.store.put_many({key: json.dumps({'title': title, 'summary': summary}, ensure_ascii=False)})
+
+    def prune(self):
+        """Удаление устаревших и вытеснение лишних записей"""
+        self.store.prune()
+
+    def close(self):
+        """Закрытие соединения с базой данных"""
+        self.store.close()
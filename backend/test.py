@@ -123,6 +123,7 @@ def test_dependencies():
     
     dependencies = [
         'feedparser',
+        'httpx',
         'requests',
         'yaml',
         'dotenv',
@@ -150,6 +151,205 @@ def test_dependencies():
     return all_installed
 
 
+def test_feed_stream():
+    """Тест потокового парсера с остановкой после max_news записей"""
+    print("\n🧪 Тестирование потокового парсинга...")
+    
+    from feed_stream import parse_feed_stream
+    
+    items = ''.join(
+        f"<item><title>Новость {i}</title><link>https://example.com/{i}</link>"
+        f"<description>Описание {i}</description></item>"
+        for i in range(50)
+    )
+    # Хвост ленты битый: парсер не должен до него дойти
+    content = f"<rss><channel>{items}".encode('utf-8') + b"<item><title>" + b"x" * 100000
+    
+    news = parse_feed_stream(content, 'https://example.com/rss', 'Example', max_news=5)
+    if [n['title'] for n in news] != [f"Новость {i}" for i in range(5)]:
+        print(f"❌ Ожидалось 5 первых новостей, получено: {[n['title'] for n in news]}")
+        return False
+    
+    print(f"✅ Разбор остановлен после {len(news)} записей")
+    return True
+
+
+def test_source_health():
+    """Тест переходов circuit breaker: closed -> open -> half_open с одной пробной попыткой"""
+    print("\n🧪 Тестирование circuit breaker источников...")
+    
+    from source_health import SourceHealth
+    
+    url = 'https://example.com/rss'
+    health = SourceHealth(failure_threshold=2, base_backoff=60)
+    
+    health.record_failure(url, 'Example', 0.1, 'timeout')
+    if not health.allow(url):
+        print("❌ Источник отключен после первой ошибки")
+        return False
+    health.record_failure(url, 'Example', 0.1, 'timeout')
+    if health.allow(url) or health.records[url]['state'] != 'open':
+        print("❌ Источник не отключен после серии ошибок")
+        return False
+    
+    # Пауза истекла: разрешается только одна пробная попытка
+    health.records[url]['retry_at'] = 0
+    if not health.allow(url) or health.allow(url) or health.records[url]['state'] != 'half_open':
+        print("❌ В состоянии half_open должна быть ровно одна пробная попытка")
+        return False
+    
+    health.record_success(url, 'Example', 0.1)
+    if health.records[url]['state'] != 'closed' or not health.allow(url):
+        print("❌ Источник не восстановлен после успешной пробной попытки")
+        return False
+    
+    print("✅ Состояния closed -> open -> half_open -> closed")
+    return True
+
+
+def test_dedup():
+    """Тест схлопывания почти одинаковых новостей из разных источников"""
+    print("\n🧪 Тестирование дедупликации новостей...")
+    
+    from dedup import deduplicate_news
+    
+    title = 'Apple unveils new iPhone 16 with faster chip and better camera'
+    description = 'Apple announced the iPhone 16 on Monday with a faster A18 chip, a new camera button and longer battery life'
+    news_list = [
+        {'title': title, 'description': description + '.', 'link': 'https://a.example/1',
+         'source': 'A', 'source_url': 'https://a.example/rss'},
+        {'title': 'Central bank raises interest rates again',
+         'description': 'The central bank raised its key rate by half a point to fight inflation.',
+         'link': 'https://c.example/1', 'source': 'C', 'source_url': 'https://c.example/rss'},
+        {'title': title, 'description': description + '!', 'link': 'https://b.example/1',
+         'source': 'B', 'source_url': 'https://b.example/rss'},
+    ]
+    
+    result = deduplicate_news(news_list)
+    if [n['link'] for n in result] != ['https://a.example/1', 'https://c.example/1']:
+        print(f"❌ Неверный результат: {[n['link'] for n in result]}")
+        return False
+    if [alt['source'] for alt in result[0].get('alternate_sources', [])] != ['B']:
+        print(f"❌ Дубликат не добавлен в alternate_sources: {result[0].get('alternate_sources')}")
+        return False
+    
+    print("✅ Дубликат из другого источника схлопнут")
+    return True
+
+
+def test_compaction():
+    """Тест очистки описаний от служебных хвостов"""
+    print("\n🧪 Тестирование очистки описаний...")
+    
+    from compaction import strip_markup
+    
+    cases = [
+        # Фраза внутри текста не должна обрезать описание
+        ('<p>Researchers say you can read more about the method in Nature. The team found...</p>',
+         'Researchers say you can read more about the method in Nature. The team found...'),
+        ('<p>Новость дня.</p><p>Читать далее →</p>', 'Новость дня.'),
+        ('Big news today. Read more »', 'Big news today.'),
+        ('Big news today. Continue reading...', 'Big news today.'),
+        ('Big news today. <p>The post Big news appeared first on Example.</p>', 'Big news today.'),
+    ]
+    
+    for text, expected in cases:
+        result = strip_markup(text)
+        if result != expected:
+            print(f"❌ strip_markup({text!r}) = {result!r}, ожидалось {expected!r}")
+            return False
+    
+    print(f"✅ Проверено {len(cases)} описаний")
+    return True
+
+
+def test_batching():
+    """Тест уменьшения бюджета батча при обрезке ответа"""
+    print("\n🧪 Тестирование адаптивных батчей...")
+    
+    from collections import deque
+    from batching import AdaptiveBatcher
+    
+    news_list = [{'title': f'Новость {i}', 'description': 'Описание новости. ' * 20} for i in range(40)]
+    batcher = AdaptiveBatcher(target_tokens=6000, min_tokens=800, max_items=40)
+    
+    first = len(batcher.take_batch(deque(range(len(news_list))), news_list))
+    batcher.record(latency=1.0, truncated=True, missing=0)
+    second = len(batcher.take_batch(deque(range(len(news_list))), news_list))
+    
+    if batcher.target_tokens != 4000 or second >= first:
+        print(f"❌ Бюджет {batcher.target_tokens:.0f} токенов, батч {first} -> {second} новостей")
+        return False
+    
+    print(f"✅ После обрезки ответа батч уменьшился с {first} до {second} новостей")
+    return True
+
+
+def test_lang_detect():
+    """Тест определения языка по письменности"""
+    print("\n🧪 Тестирование определения языка...")
+    
+    from lang_detect import detect_language, is_language
+    
+    cases = [
+        ('Центробанк снова повысил ключевую ставку', 'ru'),
+        ('Central bank raises interest rates again', 'en'),
+        # Смешанный текст: язык по преобладающей письменности
+        ('Apple представила новый iPhone 16 Pro', 'ru'),
+        ('Apple unveils new iPhone with новый чип', 'en'),
+        ('2024 — 100%', None),
+    ]
+    for text, expected in cases:
+        result = detect_language(text)
+        if result != expected:
+            print(f"❌ detect_language({text!r}) = {result!r}, ожидалось {expected!r}")
+            return False
+    
+    if not is_language('Apple представила новый iPhone 16 Pro', 'ru') or is_language('Apple unveils новый iPhone', 'ru'):
+        print("❌ is_language неверно оценивает смешанный текст")
+        return False
+    
+    print(f"✅ Проверено {len(cases)} текстов")
+    return True
+
+
+def test_ranking():
+    """Тест ранжирования по свежести и штрафа за повтор категории"""
+    print("\n🧪 Тестирование ранжирования топ-новостей...")
+    
+    from datetime import datetime, timedelta
+    from ranking import NewsRanker
+    
+    now = datetime(2024, 5, 1, 12, 0, 0)
+    
+    def published(hours_ago):
+        return (now - timedelta(hours=hours_ago)).strftime('%Y-%m-%d %H:%M:%S')
+    
+    ranker = NewsRanker(half_life_hours=12.0, category_penalty=0.0)
+    news_list = [
+        {'title': 'old', 'published': published(48), 'category': 'tech'},
+        {'title': 'fresh', 'published': published(1), 'category': 'tech'},
+        {'title': 'recent', 'published': published(6), 'category': 'tech'},
+    ]
+    if ranker.rank(news_list, 3, now=now) != [1, 2, 0]:
+        print(f"❌ Неверный порядок по свежести: {ranker.rank(news_list, 3, now=now)}")
+        return False
+    
+    # Вторая новость той же категории уступает чуть более старой новости другой категории
+    ranker = NewsRanker(half_life_hours=12.0, category_penalty=0.5)
+    news_list = [
+        {'title': 'tech 1', 'published': published(1), 'category': 'tech'},
+        {'title': 'tech 2', 'published': published(2), 'category': 'tech'},
+        {'title': 'science', 'published': published(4), 'category': 'science'},
+    ]
+    if ranker.rank(news_list, 2, now=now) != [0, 2]:
+        print(f"❌ Штраф категории не применен: {ranker.rank(news_list, 2, now=now)}")
+        return False
+    
+    print("✅ Свежие новости выше, категории чередуются")
+    return True
+
+
 def run_all_tests():
     """Запуск всех тестов"""
     print("=" * 70)
@@ -159,6 +359,13 @@ def run_all_tests():
     tests = [
         ("Зависимости", test_dependencies),
         ("Импорты модулей", test_imports),
+        ("Потоковый парсинг", test_feed_stream),
+        ("Circuit breaker источников", test_source_health),
+        ("Дедупликация новостей", test_dedup),
+        ("Очистка описаний", test_compaction),
+        ("Адаптивные батчи", test_batching),
+        ("Определение языка", test_lang_detect),
+        ("Ранжирование топ-новостей", test_ranking),
         ("Конфигурация", test_config_loading),
         ("Переменные окружения", test_env_file),
         ("RSS парсер", test_rss_parser),
@@ -0,0 +1,81 @@
+"""
+Персистентная память переводов заголовков и резюме между запусками
+"""
+import hashlib
+from typing import Dict, List, Optional
+
+from sqlite_kv import SQLiteKV
+
+
+class TranslationMemo:
+    """Память переводов по исходному тексту и целевому языку поверх SQLiteKV"""
+
+    def __init__(self, path: str = 'output/translation_memo.db', max_entries: int = 50000, max_age_days: int = 30):
+        """
+        Инициализация памяти переводов
+
+        Args:
+            path: Путь к файлу базы данных
+            max_entries: Максимальное количество записей (вытесняются давно не использованные)
+            max_age_days: Максимальный возраст записи в днях
+        """
+        self.store = SQLiteKV(path, 'translations', max_entries, max_age_days, "Память переводов")
+
+    @staticmethod
+    def make_key(text: str, language: str) -> str:
+        """
+        Ключ записи по исходному тексту и целевому языку
+
+        Args:
+            text: Исходный текст
+            language: Код целевого языка
+
+        Returns:
+            Ключ записи
+        """
+        raw = language + '\x1f' + text.strip()
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: List[str], language: str) -> Dict[str, str]:
+        """
+        Поиск сохраненных переводов
+
+        Args:
+            texts: Исходные тексты
+            language: Код целевого языка
+
+        Returns:
+            Переводы по исходному тексту (только найденные)
+        """
+        keys = {self.make_key(text, language): text for text in texts if text}
+        return {keys[key]: translation for key, translation in self.store.get_many(list(keys)).items()}
+
+    def get(self, text: str, language: str) -> Optional[str]:
+        """Получение перевода одного текста"""
+        return self.get_many([text], language).get(text)
+
+    def put_many(self, translations: Dict[str, str], language: str):
+        """
+        Сохранение переводов
+
+        Args:
+            translations: Переводы по исходному тексту
+            language: Код целевого языка
+        """
+        self.store.put_many({
+            self.make_key(text, language): translation
+            for text, translation in translations.items()
+            if text and translation and translation != text
+        })
+
+    def put(self, text: str, translation: str, language: str):
+        """Сохранение одного перевода"""
+        self.put_many({text: translation}, language)
+
+    def prune(self):
+        """Удаление устаревших и вытеснение лишних записей"""
+        self.store.prune()
+
+    def close(self):
+        """Закрытие соединения с базой данных"""
+        self.store.close()
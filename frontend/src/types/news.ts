@@ -30,6 +30,8 @@ export interface ApiNewsItem {
   source_url: string;
   category: string;
   summary?: string;
+  summary_pending?: boolean;
+  summary_source?: string;
 }
 
 export interface ApiNewsResponse {